@@ -0,0 +1,57 @@
+"""Shared file helpers for the pipeline scripts."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Iterator
+
+_JSON_WS = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(path: Path) -> Iterator[Any]:
+    """Yield items of a top-level JSON array one at a time.
+
+    Only the raw text is held in full; each decoded item can be dropped once its
+    fields are read. A missing file yields nothing, valid JSON that is not an
+    array raises TypeError, and malformed JSON raises ValueError.
+    """
+    if not path.exists():
+        return
+    text = path.read_bytes().decode("utf-8")
+    decoder = json.JSONDecoder()
+
+    idx = _JSON_WS.match(text, 0).end()
+    if not text.startswith("[", idx):
+        json.loads(text)
+        raise TypeError(f"JSON payload is not an array: {path}")
+    idx = _JSON_WS.match(text, idx + 1).end()
+    if text.startswith("]", idx):
+        return
+
+    while True:
+        item, idx = decoder.raw_decode(text, idx)
+        yield item
+        idx = _JSON_WS.match(text, idx).end()
+        if text.startswith(",", idx):
+            idx = _JSON_WS.match(text, idx + 1).end()
+            continue
+        if text.startswith("]", idx):
+            return
+        raise ValueError(f"Malformed JSON array at offset {idx}: {path}")
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write data to path via a fsynced sibling temp file and os.replace.
+
+    A killed run never leaves a truncated JSON file behind for the next
+    pipeline step.
+    """
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
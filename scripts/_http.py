@@ -0,0 +1,126 @@
+"""Shared venue REST helpers for the live builders and authenticated overlays.
+
+One keep-alive connection pool per process, gzip on every GET, and a short-lived
+on-disk cache of raw response bodies under data/.cache/http/, so the CEX, CEX-DEX,
+funding and basis builders reuse each other's snapshots across runs.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Keep-alive pool: idle HTTPS connections per host, so repeated REST calls to the
+# same venue reuse one TCP+TLS session instead of a fresh handshake each.
+POOL_MAXSIZE_PER_HOST = 4
+_POOL_LOCK = threading.Lock()
+_IDLE_CONNECTIONS: dict[str, list[http.client.HTTPSConnection]] = defaultdict(list)
+
+# Raw response bodies shared across the live builders for a few seconds.
+HTTP_CACHE_DIR = ROOT / "data" / ".cache" / "http"
+DEFAULT_HTTP_CACHE_TTL_SEC = 5.0
+
+
+def _acquire_connection(host: str, timeout: float) -> tuple[http.client.HTTPSConnection, bool]:
+    with _POOL_LOCK:
+        idle = _IDLE_CONNECTIONS[host]
+        conn = idle.pop() if idle else None
+
+    if conn is None:
+        return http.client.HTTPSConnection(host, timeout=timeout), False
+
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn, True
+
+
+def _release_connection(host: str, conn: http.client.HTTPSConnection) -> None:
+    with _POOL_LOCK:
+        idle = _IDLE_CONNECTIONS[host]
+        if len(idle) < POOL_MAXSIZE_PER_HOST:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def http_get_bytes(url: str, timeout: float = 12, headers: dict[str, str] | None = None) -> bytes:
+    """GET url over a pooled connection; headers (e.g. API keys) extend the defaults."""
+    parts = urllib.parse.urlsplit(url)
+    target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+    # Ticker and funding snapshots list every symbol on the venue; gzip cuts them several-fold.
+    request_headers = {"User-Agent": "master-trading-intel/0.1", "Accept-Encoding": "gzip"}
+    if headers:
+        request_headers.update(headers)
+
+    for attempt in range(2):
+        conn, reused = _acquire_connection(parts.netloc, timeout)
+        try:
+            conn.request("GET", target, headers=request_headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except ConnectionError:
+            conn.close()
+            # Server may have dropped an idle keep-alive socket; retry once on a fresh one.
+            if reused and attempt == 0:
+                continue
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+        if resp.will_close:
+            conn.close()
+        else:
+            _release_connection(parts.netloc, conn)
+
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        if resp.getheader("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    raise ConnectionError(f"connection retry exhausted: {parts.netloc}")
+
+
+def http_get_json(url: str, timeout: float = 12, headers: dict[str, str] | None = None) -> dict | list:
+    return json.loads(http_get_bytes(url, timeout, headers))
+
+
+def http_get_json_cached(url: str, ttl_sec: float, timeout: float = 12) -> dict | list:
+    """http_get_json through a short-lived on-disk cache keyed on the URL.
+
+    The live builders pull overlapping venue-wide snapshots, so a run started
+    right after another (or a sibling builder) reuses the raw body.
+    """
+    if ttl_sec <= 0:
+        return http_get_json(url, timeout)
+    path = HTTP_CACHE_DIR / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]}.json"
+    try:
+        if time.time() - path.stat().st_mtime < ttl_sec:
+            return json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        pass
+
+    body = http_get_bytes(url, timeout)
+    payload = json.loads(body)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Per-writer temp name: sibling builders may refresh the same entry at once.
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return payload
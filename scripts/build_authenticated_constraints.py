@@ -25,41 +25,121 @@ import hashlib
 import hmac
 import json
 import os
+import threading
 import time
+import urllib.error
 import urllib.parse
-import urllib.request
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
+
+from _fileio import iter_json_array
+from _http import http_get_json
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_CONSTRAINTS = ROOT / "data" / "execution_constraints.latest.json"
 DEFAULT_QUOTES = ROOT / "data" / "normalized_quotes_cex_latest.json"
 
+DEFAULT_CACHE_DIR = ROOT / "data" / ".cache" / "auth_overlay"
+
+USD_QUOTES = frozenset({"USDT", "USDC", "USD"})
+
+# Binance signed endpoints are weight-limited (~1200/min); cap in-flight per-asset calls.
+BINANCE_SIGNED_CONCURRENCY = 8
+# next-hourly-interest-rate accepts at most 20 comma-separated assets per call.
+BINANCE_RATE_ASSETS_PER_REQUEST = 20
+
+# One executor for all Binance signed fan-out, created on first use and kept for
+# the life of the process, so the borrow and rate phases share its warm workers.
+_SIGNED_EXECUTOR_LOCK = threading.Lock()
+_SIGNED_EXECUTOR: ThreadPoolExecutor | None = None
+
+# 429 = request-weight limit hit, 418 = IP auto-banned after ignoring 429s; both
+# carry Retry-After. 5xx on these read-only GETs is safe to retry as well.
+BINANCE_RETRY_STATUSES = frozenset({418, 429, 500, 502, 503, 504})
+BINANCE_MAX_RETRIES = 3
+BINANCE_RETRY_BASE_SEC = 1.0
+# Give up instead of sleeping through long bans; the asset lands in failures.
+BINANCE_RETRY_MAX_WAIT_SEC = 30.0
+# Shared hold-off: once any worker sees a rate-limit response, every worker waits
+# it out instead of each one spending more weight on the same limit.
+_BINANCE_BACKOFF_LOCK = threading.Lock()
+_binance_backoff_until = 0.0
 
-def parse_args() -> argparse.Namespace:
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Overlay constraints with authenticated balances")
     p.add_argument("--constraints", type=Path, default=DEFAULT_CONSTRAINTS)
     p.add_argument("--quotes", type=Path, default=DEFAULT_QUOTES)
     p.add_argument("--timeout-sec", type=float, default=8.0)
     p.add_argument("--min-inventory-usd", type=float, default=1.0)
-    return p.parse_args()
+    p.add_argument(
+        "--cache-ttl-sec",
+        type=float,
+        default=600.0,
+        help="Reuse cached Binance maxBorrowable responses younger than this (0 disables).",
+    )
+    p.add_argument(
+        "--rate-cache-ttl-sec",
+        type=float,
+        default=300.0,
+        help="Reuse cached Binance next-hour borrow rates younger than this (0 disables).",
+    )
+    return p.parse_args(argv)
 
 
 def load_json(path: Path, fallback: Any) -> Any:
     if not path.exists():
         return fallback
     try:
-        return json.loads(path.read_text())
+        return json.loads(path.read_bytes())
     except Exception:
         return fallback
 
 
-def _http_get_json(url: str, headers: dict[str, str], timeout_sec: float) -> Any:
-    req = urllib.request.Request(url=url, headers=headers, method="GET")
-    with urllib.request.urlopen(req, timeout=timeout_sec) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+@lru_cache(maxsize=8)
+def _hmac_base(api_secret: str) -> hmac.HMAC:
+    return hmac.new(api_secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+
+def _signed_executor() -> ThreadPoolExecutor:
+    global _SIGNED_EXECUTOR
+    with _SIGNED_EXECUTOR_LOCK:
+        if _SIGNED_EXECUTOR is None:
+            _SIGNED_EXECUTOR = ThreadPoolExecutor(
+                max_workers=BINANCE_SIGNED_CONCURRENCY,
+                thread_name_prefix="binance-signed",
+            )
+        return _SIGNED_EXECUTOR
+
+
+def _hmac_for_secret(api_secret: str) -> hmac.HMAC:
+    # Copying a keyed HMAC skips re-deriving the inner/outer key pads on every request.
+    return _hmac_base(api_secret).copy()
+
+
+def _retry_after_sec(exc: urllib.error.HTTPError, fallback: float) -> float:
+    raw = exc.headers.get("Retry-After") if exc.headers is not None else None
+    try:
+        return max(0.0, float(raw)) if raw is not None else fallback
+    except ValueError:
+        return fallback
+
+
+def _wait_binance_backoff() -> None:
+    with _BINANCE_BACKOFF_LOCK:
+        delay = _binance_backoff_until - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _extend_binance_backoff(delay_sec: float) -> None:
+    global _binance_backoff_until
+    with _BINANCE_BACKOFF_LOCK:
+        _binance_backoff_until = max(_binance_backoff_until, time.monotonic() + delay_sec)
 
 
 def _binance_signed_get(
@@ -69,13 +149,30 @@ def _binance_signed_get(
     api_secret: str,
     timeout_sec: float,
 ) -> Any:
-    payload = dict(params)
-    payload["timestamp"] = int(time.time() * 1000)
-    payload["recvWindow"] = 5000
-    query = urllib.parse.urlencode(payload)
-    signature = hmac.new(api_secret.encode("utf-8"), query.encode("utf-8"), hashlib.sha256).hexdigest()
-    url = f"https://api.binance.com{path}?{query}&signature={signature}"
-    return _http_get_json(url, headers={"X-MBX-APIKEY": api_key}, timeout_sec=timeout_sec)
+    prefix = urllib.parse.urlencode(params)
+    attempt = 0
+    while True:
+        _wait_binance_backoff()
+        # Re-sign on every attempt: the timestamp must stay inside recvWindow.
+        timestamp = time.time_ns() // 1_000_000
+        query = f"{prefix}&timestamp={timestamp}&recvWindow=5000" if prefix else f"timestamp={timestamp}&recvWindow=5000"
+        mac = _hmac_for_secret(api_secret)
+        mac.update(query.encode("utf-8"))
+        signature = mac.hexdigest()
+        url = f"https://api.binance.com{path}?{query}&signature={signature}"
+        try:
+            return http_get_json(url, timeout_sec, headers={"X-MBX-APIKEY": api_key})
+        except urllib.error.HTTPError as exc:
+            if exc.code not in BINANCE_RETRY_STATUSES or attempt == BINANCE_MAX_RETRIES:
+                raise
+            delay = _retry_after_sec(exc, fallback=BINANCE_RETRY_BASE_SEC * (2**attempt))
+            if delay > BINANCE_RETRY_MAX_WAIT_SEC:
+                raise
+            if exc.code in (418, 429):
+                _extend_binance_backoff(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
 
 
 def _bybit_signed_get(
@@ -85,11 +182,13 @@ def _bybit_signed_get(
     api_secret: str,
     timeout_sec: float,
 ) -> Any:
-    timestamp = str(int(time.time() * 1000))
+    timestamp = str(time.time_ns() // 1_000_000)
     recv_window = "5000"
     query = urllib.parse.urlencode(params)
     pre_sign = f"{timestamp}{api_key}{recv_window}{query}"
-    sign = hmac.new(api_secret.encode("utf-8"), pre_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    mac = _hmac_for_secret(api_secret)
+    mac.update(pre_sign.encode("utf-8"))
+    sign = mac.hexdigest()
 
     headers = {
         "X-BAPI-API-KEY": api_key,
@@ -98,7 +197,7 @@ def _bybit_signed_get(
         "X-BAPI-SIGN": sign,
     }
     url = f"https://api.bybit.com{path}?{query}"
-    return _http_get_json(url, headers=headers, timeout_sec=timeout_sec)
+    return http_get_json(url, timeout_sec, headers=headers)
 
 
 def _to_float(raw: Any, fallback: float = 0.0) -> float:
@@ -114,30 +213,72 @@ def _chunk(items: list[str], size: int) -> list[list[str]]:
     return [items[i : i + size] for i in range(0, len(items), size)]
 
 
-def build_price_map(quotes: list[dict[str, Any]]) -> dict[str, float]:
+def _cache_path(key: tuple[str, ...]) -> Path:
+    digest = hashlib.sha256("\x1f".join(key).encode("utf-8")).hexdigest()[:32]
+    return DEFAULT_CACHE_DIR / f"{digest}.json"
+
+
+def _cache_get(key: tuple[str, ...], ttl_sec: float) -> Any:
+    if ttl_sec <= 0:
+        return None
+    entry = load_json(_cache_path(key), fallback=None)
+    if not isinstance(entry, dict):
+        return None
+    if time.time() - _to_float(entry.get("t"), 0.0) > ttl_sec:
+        return None
+    return entry.get("v")
+
+
+def _cache_put(key: tuple[str, ...], value: Any) -> None:
+    path = _cache_path(key)
+    tmp = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps({"t": time.time(), "v": value}))
+        os.replace(tmp, path)
+    except OSError:
+        # Cache is best-effort; a read-only checkout just means no reuse next run.
+        pass
+
+
+def _account_tag(api_key: str) -> str:
+    # Cache entries are per account without writing the key itself to disk.
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _upper_median(values: list[float]) -> float:
+    """Return sorted(values)[len // 2] without sorting the common 1-2 venue buckets."""
+    if len(values) <= 2:
+        return max(values)
+    return sorted(values)[len(values) // 2]
+
+
+def build_price_map(quotes: Iterable[Any]) -> tuple[dict[str, float], int]:
+    """Return (USD price map, number of quote rows consumed) in a single pass."""
+    # Reject on quote currency first so non-USD rows never pay for base/mid parsing.
     buckets: dict[str, list[float]] = defaultdict(list)
+    n_quotes = 0
     for row in quotes:
+        n_quotes += 1
         if not isinstance(row, dict):
             continue
-        base = str(row.get("base", "")).strip().upper()
         quote = str(row.get("quote", "")).strip().upper()
+        if quote not in USD_QUOTES:
+            continue
+        base = str(row.get("base", "")).strip().upper()
         mid = _to_float(row.get("mid_price", 0), 0.0)
-        if not base or not quote or mid <= 0:
+        if not base or mid <= 0:
             continue
-        if quote in {"USDT", "USDC", "USD"}:
-            buckets[base].append(mid)
+        buckets[base].append(mid)
 
     out: dict[str, float] = {
         "USD": 1.0,
         "USDT": 1.0,
         "USDC": 1.0,
     }
-    for asset, arr in buckets.items():
-        if not arr:
-            continue
-        arr_sorted = sorted(arr)
-        out[asset] = arr_sorted[len(arr_sorted) // 2]
-    return out
+    for asset, mids in buckets.items():
+        out[asset] = _upper_median(mids)
+    return out, n_quotes
 
 
 def fetch_binance_inventory_usd(
@@ -158,17 +299,19 @@ def fetch_binance_inventory_usd(
     if not isinstance(rows, list):
         return {}
 
+    # EAFP walk: a malformed balance row is skipped by one except clause instead of
+    # paying for isinstance/_to_float guards on every well-formed row.
+    get_px = price_map.get
     out: dict[str, float] = {}
     for row in rows:
-        if not isinstance(row, dict):
-            continue
-        asset = str(row.get("asset", "")).strip().upper()
-        if not asset:
+        try:
+            asset = row["asset"].strip().upper()
+            qty = float(row.get("free", 0)) + float(row.get("locked", 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
             continue
-        qty = _to_float(row.get("free", 0), 0.0) + _to_float(row.get("locked", 0), 0.0)
-        if qty <= 0:
+        if not asset or qty <= 0:
             continue
-        px = price_map.get(asset)
+        px = get_px(asset)
         if px is None:
             continue
         usd = qty * px
@@ -198,21 +341,24 @@ def fetch_bybit_inventory_usd(
     result = payload.get("result", {}) if isinstance(payload.get("result"), dict) else {}
     lists = result.get("list", []) if isinstance(result.get("list"), list) else []
 
+    get_px = price_map.get
     out: dict[str, float] = {}
     for block in lists:
-        if not isinstance(block, dict):
+        try:
+            coins = block["coin"]
+        except (KeyError, TypeError):
+            continue
+        if not isinstance(coins, list):
             continue
-        coins = block.get("coin", []) if isinstance(block.get("coin"), list) else []
         for coin in coins:
-            if not isinstance(coin, dict):
-                continue
-            asset = str(coin.get("coin", "")).strip().upper()
-            if not asset:
+            try:
+                asset = coin["coin"].strip().upper()
+                qty = float(coin["walletBalance"])
+            except (KeyError, TypeError, ValueError, AttributeError):
                 continue
-            qty = _to_float(coin.get("walletBalance", 0), 0.0)
-            if qty <= 0:
+            if not asset or qty <= 0:
                 continue
-            px = price_map.get(asset)
+            px = get_px(asset)
             if px is None:
                 continue
             usd = qty * px
@@ -222,15 +368,45 @@ def fetch_bybit_inventory_usd(
     return out
 
 
+def _fetch_binance_interest_rate_group(
+    group: list[str],
+    api_key: str,
+    api_secret: str,
+    timeout_sec: float,
+) -> Any:
+    try:
+        return _binance_signed_get(
+            "/sapi/v1/margin/next-hourly-interest-rate",
+            {"assets": ",".join(group), "isIsolated": "FALSE"},
+            api_key=api_key,
+            api_secret=api_secret,
+            timeout_sec=timeout_sec,
+        )
+    except Exception:
+        # Endpoint compatibility fallback.
+        return _binance_signed_get(
+            "/sapi/v1/margin/next-hourly-interest-rate",
+            {"assets": ",".join(group)},
+            api_key=api_key,
+            api_secret=api_secret,
+            timeout_sec=timeout_sec,
+        )
+
+
 def fetch_binance_borrow_overlay(
     api_key: str,
     api_secret: str,
     assets: list[str],
     price_map: dict[str, float],
     timeout_sec: float,
+    cache_ttl_sec: float = 0.0,
+    rate_cache_ttl_sec: float = 0.0,
 ) -> tuple[dict[str, float], dict[str, float], list[str]]:
     """Fetch Binance borrow capacity + next-hour borrow rate for given assets.
 
+    Responses younger than `cache_ttl_sec` (maxBorrowable) / `rate_cache_ttl_sec`
+    (next-hour rate) are served from the on-disk cache instead of the API.
+
     Returns:
       - max_borrow_usd_by_asset
       - borrow_rate_bps_per_hour_by_asset
@@ -245,22 +421,74 @@ def fetch_binance_borrow_overlay(
     if not target_assets:
         return max_borrow_usd, borrow_rate_bps_per_hour, failures
 
+    # Borrow capacity is only usable once converted to USD, so skip the signed
+    # call (and its request weight) for assets without a reference price.
+    priced_assets: list[str] = []
     for asset in target_assets:
-        try:
-            payload = _binance_signed_get(
-                "/sapi/v1/margin/maxBorrowable",
-                {"asset": asset},
+        if asset in price_map:
+            priced_assets.append(asset)
+        else:
+            failures.append(f"binance_price_missing:{asset}")
+
+    account = _account_tag(api_key)
+    max_borrow_payloads: dict[str, Any] = {}
+    for asset in priced_assets:
+        cached = _cache_get(("binance_max_borrow", account, asset), cache_ttl_sec)
+        if isinstance(cached, dict):
+            max_borrow_payloads[asset] = cached
+    to_fetch = [asset for asset in priced_assets if asset not in max_borrow_payloads]
+
+    # Borrow rates are unit-free, so they are still fetched for every target asset.
+    rate_misses: list[str] = []
+    for asset in target_assets:
+        cached_rate = _cache_get(("binance_interest_rate", account, asset), rate_cache_ttl_sec)
+        if isinstance(cached_rate, (int, float)):
+            borrow_rate_bps_per_hour[asset] = float(cached_rate)
+        else:
+            rate_misses.append(asset)
+    groups = _chunk(rate_misses, BINANCE_RATE_ASSETS_PER_REQUEST) if rate_misses else []
+
+    # Per-asset borrow lookups and rate groups are independent; queue them all on
+    # the shared executor up front so both phases overlap (~max(RTT), not N x RTT).
+    pool = _signed_executor()
+    max_borrow_futures = {
+        asset: pool.submit(
+            _binance_signed_get,
+            "/sapi/v1/margin/maxBorrowable",
+            {"asset": asset},
+            api_key=api_key,
+            api_secret=api_secret,
+            timeout_sec=timeout_sec,
+        )
+        for asset in to_fetch
+    }
+    group_futures = [
+        (
+            group,
+            pool.submit(
+                _fetch_binance_interest_rate_group,
+                group,
                 api_key=api_key,
                 api_secret=api_secret,
                 timeout_sec=timeout_sec,
-            )
-        except Exception:
-            failures.append(f"binance_max_borrow_error:{asset}")
-            continue
+            ),
+        )
+        for group in groups
+    ]
 
-        if not isinstance(payload, dict):
-            failures.append(f"binance_max_borrow_bad_payload:{asset}")
-            continue
+    for asset in priced_assets:
+        payload = max_borrow_payloads.get(asset)
+        if payload is None:
+            try:
+                payload = max_borrow_futures[asset].result()
+            except Exception:
+                failures.append(f"binance_max_borrow_error:{asset}")
+                continue
+
+            if not isinstance(payload, dict):
+                failures.append(f"binance_max_borrow_bad_payload:{asset}")
+                continue
+            _cache_put(("binance_max_borrow", account, asset), payload)
 
         amount = _to_float(payload.get("amount"), -1.0)
         borrow_limit = _to_float(payload.get("borrowLimit"), -1.0)
@@ -269,38 +497,14 @@ def fetch_binance_borrow_overlay(
             failures.append(f"binance_max_borrow_missing_amount:{asset}")
             continue
 
-        px = price_map.get(asset)
-        if px is None:
-            failures.append(f"binance_price_missing:{asset}")
-            continue
-
-        max_borrow_usd[asset] = round(max(0.0, asset_units * px), 6)
-
-    for group in _chunk(target_assets, 20):
-        params = {"assets": ",".join(group), "isIsolated": "FALSE"}
-        payload: Any = None
+        max_borrow_usd[asset] = round(max(0.0, asset_units * price_map[asset]), 6)
 
+    for group, future in group_futures:
         try:
-            payload = _binance_signed_get(
-                "/sapi/v1/margin/next-hourly-interest-rate",
-                params,
-                api_key=api_key,
-                api_secret=api_secret,
-                timeout_sec=timeout_sec,
-            )
+            payload = future.result()
         except Exception:
-            # Endpoint compatibility fallback.
-            try:
-                payload = _binance_signed_get(
-                    "/sapi/v1/margin/next-hourly-interest-rate",
-                    {"assets": ",".join(group)},
-                    api_key=api_key,
-                    api_secret=api_secret,
-                    timeout_sec=timeout_sec,
-                )
-            except Exception:
-                failures.append(f"binance_interest_rate_error:{','.join(group)}")
-                continue
+            failures.append(f"binance_interest_rate_error:{','.join(group)}")
+            continue
 
         rows = payload if isinstance(payload, list) else []
         if isinstance(payload, dict):
@@ -319,12 +523,13 @@ def fetch_binance_borrow_overlay(
                 continue
             # Fraction -> bps per hour.
             borrow_rate_bps_per_hour[asset] = round(max(0.0, rate_fraction_per_hour * 10000.0), 6)
+            _cache_put(("binance_interest_rate", account, asset), borrow_rate_bps_per_hour[asset])
 
     return max_borrow_usd, borrow_rate_bps_per_hour, failures
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
 
     constraints = load_json(args.constraints, fallback={})
     if not isinstance(constraints, dict):
@@ -334,10 +539,11 @@ def main() -> None:
     if not isinstance(rules, list):
         raise SystemExit("Constraints rules is not a list")
 
-    quote_payload = load_json(args.quotes, fallback=[])
-    if not isinstance(quote_payload, list):
-        quote_payload = []
-    price_map = build_price_map(quote_payload)
+    # Stream quote rows straight into the price buckets instead of materializing the list.
+    try:
+        price_map, n_quotes = build_price_map(iter_json_array(args.quotes))
+    except (OSError, TypeError, ValueError):
+        price_map, n_quotes = build_price_map([])
 
     binance_key = os.getenv("BINANCE_API_KEY", "").strip()
     binance_secret = os.getenv("BINANCE_API_SECRET", "").strip()
@@ -349,56 +555,83 @@ def main() -> None:
     binance_borrow_rate_bps: dict[str, float] = {}
     failures: list[str] = []
 
-    if binance_key and binance_secret:
-        try:
-            inventory_by_venue["binance"] = fetch_binance_inventory_usd(
+    binance_auth = bool(binance_key and binance_secret)
+    bybit_auth = bool(bybit_key and bybit_secret)
+    if not binance_auth:
+        failures.append("binance_auth_missing")
+    if not bybit_auth:
+        failures.append("bybit_auth_missing")
+
+    # Normalize venue/asset once; the index drives borrow-asset selection and the
+    # overlay loop.
+    rule_index: dict[tuple[str, str], list[dict[str, Any]]] = defaultdict(list)
+    for row in rules:
+        if not isinstance(row, dict):
+            continue
+        venue = str(row.get("venue", "")).strip().lower()
+        asset = str(row.get("asset", "")).strip().upper()
+        rule_index[(venue, asset)].append(row)
+
+    # Borrow overlay only needs the rule universe, not inventory, so all three
+    # account snapshots are independent and can be fetched in parallel.
+    binance_assets = sorted({asset for venue, asset in rule_index if venue == "binance" and asset})
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        binance_inventory_future = None
+        binance_borrow_future = None
+        bybit_inventory_future = None
+
+        if binance_auth:
+            binance_inventory_future = pool.submit(
+                fetch_binance_inventory_usd,
                 api_key=binance_key,
                 api_secret=binance_secret,
                 price_map=price_map,
                 timeout_sec=args.timeout_sec,
                 min_inventory_usd=args.min_inventory_usd,
             )
+            binance_borrow_future = pool.submit(
+                fetch_binance_borrow_overlay,
+                api_key=binance_key,
+                api_secret=binance_secret,
+                assets=binance_assets,
+                price_map=price_map,
+                timeout_sec=args.timeout_sec,
+                cache_ttl_sec=args.cache_ttl_sec,
+                rate_cache_ttl_sec=args.rate_cache_ttl_sec,
+            )
+        if bybit_auth:
+            bybit_inventory_future = pool.submit(
+                fetch_bybit_inventory_usd,
+                api_key=bybit_key,
+                api_secret=bybit_secret,
+                price_map=price_map,
+                timeout_sec=args.timeout_sec,
+                min_inventory_usd=args.min_inventory_usd,
+            )
+
+    if binance_inventory_future is not None:
+        try:
+            inventory_by_venue["binance"] = binance_inventory_future.result()
         except Exception:
             failures.append("binance_inventory_error")
 
-        binance_assets = sorted(
-            {
-                str(r.get("asset", "")).strip().upper()
-                for r in rules
-                if isinstance(r, dict) and str(r.get("venue", "")).strip().lower() == "binance"
-            }
-        )
+    if binance_borrow_future is not None:
         try:
             (
                 binance_max_borrow_usd,
                 binance_borrow_rate_bps,
                 borrow_failures,
-            ) = fetch_binance_borrow_overlay(
-                api_key=binance_key,
-                api_secret=binance_secret,
-                assets=binance_assets,
-                price_map=price_map,
-                timeout_sec=args.timeout_sec,
-            )
+            ) = binance_borrow_future.result()
             failures.extend(borrow_failures)
         except Exception:
             failures.append("binance_borrow_overlay_error")
-    else:
-        failures.append("binance_auth_missing")
 
-    if bybit_key and bybit_secret:
+    if bybit_inventory_future is not None:
         try:
-            inventory_by_venue["bybit"] = fetch_bybit_inventory_usd(
-                api_key=bybit_key,
-                api_secret=bybit_secret,
-                price_map=price_map,
-                timeout_sec=args.timeout_sec,
-                min_inventory_usd=args.min_inventory_usd,
-            )
+            inventory_by_venue["bybit"] = bybit_inventory_future.result()
         except Exception:
             failures.append("bybit_inventory_error")
-    else:
-        failures.append("bybit_auth_missing")
 
     updated_rules = 0
     inventory_updates = 0
@@ -406,60 +639,84 @@ def main() -> None:
     borrow_rate_updates = 0
     venues_touched: dict[str, int] = defaultdict(int)
 
-    for row in rules:
-        if not isinstance(row, dict):
-            continue
+    # Only venues that returned authenticated data can change a rule; rows on idle
+    # venues (missing auth, failed fetch) are skipped before any per-row parsing.
+    active_venues = frozenset(
+        venue
+        for venue, has_data in (
+            ("binance", bool(inventory_by_venue["binance"] or binance_max_borrow_usd or binance_borrow_rate_bps)),
+            ("bybit", bool(inventory_by_venue["bybit"])),
+        )
+        if has_data
+    )
 
-        venue = str(row.get("venue", "")).strip().lower()
-        asset = str(row.get("asset", "")).strip().upper()
-        if venue not in {"binance", "bybit"} or not asset:
+    for (venue, asset), venue_rows in rule_index.items():
+        if venue not in active_venues or not asset:
             continue
 
-        row_updated = False
-
+        # Clamp and round each overlay value once per key; the cap math below reuses
+        # these locals instead of re-parsing what was just written into the row.
         venue_inventory = inventory_by_venue.get(venue, {})
-        if venue_inventory:
-            inv_usd = _to_float(venue_inventory.get(asset, 0.0), 0.0)
-            row["available_inventory_usd"] = round(max(0.0, inv_usd), 6)
-            row_updated = True
-            inventory_updates += 1
-
-        if venue == "binance":
-            if asset in binance_max_borrow_usd:
-                row["max_borrow_usd"] = round(max(0.0, _to_float(binance_max_borrow_usd[asset], 0.0)), 6)
+        inv_usd = (
+            round(max(0.0, _to_float(venue_inventory.get(asset, 0.0), 0.0)), 6) if venue_inventory else None
+        )
+        borrow_usd = binance_max_borrow_usd.get(asset) if venue == "binance" else None
+        if borrow_usd is not None:
+            borrow_usd = round(max(0.0, _to_float(borrow_usd, 0.0)), 6)
+        borrow_rate = binance_borrow_rate_bps.get(asset) if venue == "binance" else None
+        if borrow_rate is not None:
+            borrow_rate = round(max(0.0, _to_float(borrow_rate, 0.0)), 6)
+
+        for row in venue_rows:
+            row_updated = False
+
+            if inv_usd is not None:
+                row["available_inventory_usd"] = inv_usd
+                inv_usd_for_cap = inv_usd
+                row_updated = True
+                inventory_updates += 1
+            else:
+                inv_usd_for_cap = None
+
+            if borrow_usd is not None:
+                row["max_borrow_usd"] = borrow_usd
+                max_borrow_usd = borrow_usd
                 row_updated = True
                 borrow_cap_updates += 1
+            else:
+                max_borrow_usd = None
 
-            if asset in binance_borrow_rate_bps:
-                row["borrow_rate_bps_per_hour"] = round(
-                    max(0.0, _to_float(binance_borrow_rate_bps[asset], 0.0)),
-                    6,
-                )
+            if borrow_rate is not None:
+                row["borrow_rate_bps_per_hour"] = borrow_rate
                 row_updated = True
                 borrow_rate_updates += 1
 
-        if not row_updated:
-            continue
+            if not row_updated:
+                continue
 
-        existing_cap = max(0.0, _to_float(row.get("max_position_usd", 0.0), 0.0))
-        inv_usd_for_cap = max(0.0, _to_float(row.get("available_inventory_usd", 0.0), 0.0))
-        max_borrow_usd = max(0.0, _to_float(row.get("max_borrow_usd", 0.0), 0.0))
+            existing_cap = max(0.0, _to_float(row.get("max_position_usd", 0.0), 0.0))
+            if inv_usd_for_cap is None:
+                inv_usd_for_cap = max(0.0, _to_float(row.get("available_inventory_usd", 0.0), 0.0))
+            if max_borrow_usd is None:
+                max_borrow_usd = max(0.0, _to_float(row.get("max_borrow_usd", 0.0), 0.0))
 
-        conservative_cap = inv_usd_for_cap + max_borrow_usd
+            conservative_cap = inv_usd_for_cap + max_borrow_usd
 
-        max_leverage = max(0.0, _to_float(row.get("max_leverage", 0.0), 0.0))
-        if max_leverage > 0:
-            leverage_cap = inv_usd_for_cap * max_leverage
-            conservative_cap = min(conservative_cap, leverage_cap)
+            max_leverage = max(0.0, _to_float(row.get("max_leverage", 0.0), 0.0))
+            if max_leverage > 0:
+                leverage_cap = inv_usd_for_cap * max_leverage
+                conservative_cap = min(conservative_cap, leverage_cap)
 
-        new_cap = min(existing_cap, conservative_cap) if existing_cap > 0 else conservative_cap
-        row["max_position_usd"] = round(max(0.0, new_cap), 6)
+            new_cap = min(existing_cap, conservative_cap) if existing_cap > 0 else conservative_cap
+            row["max_position_usd"] = round(max(0.0, new_cap), 6)
 
-        updated_rules += 1
-        venues_touched[venue] += 1
+            updated_rules += 1
+            venues_touched[venue] += 1
 
     constraints["generated_at"] = datetime.now(timezone.utc).isoformat()
     constraints["version"] = "execution_constraints_v1"
+    # Sorted on the raw venue/asset strings, as written, so rules that are not
+    # normalized in the file keep their committed position.
     constraints["rules"] = sorted(
         [r for r in rules if isinstance(r, dict)],
         key=lambda r: (str(r.get("venue", "")), str(r.get("asset", ""))),
@@ -468,7 +725,7 @@ def main() -> None:
     args.constraints.parent.mkdir(parents=True, exist_ok=True)
     args.constraints.write_text(json.dumps(constraints, indent=2))
 
-    print(f"Quotes loaded: {len(quote_payload)}")
+    print(f"Quotes loaded: {n_quotes}")
     print(f"Price map assets: {len(price_map)}")
     print(f"Constraint rules total: {len(constraints['rules'])}")
     print(f"Authenticated rules updated: {updated_rules}")
@@ -23,29 +23,48 @@ import re
 import time
 import urllib.error
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
+
+from _fileio import atomic_write_bytes, iter_json_array
+from _http import http_get_json
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_INPUT_CANDIDATES = ROOT / "data" / "opportunity_candidates.combined.live.json"
 DEFAULT_FEE_TABLE = ROOT / "data" / "execution_fee_table.latest.json"
 
+DEFAULT_CACHE_DIR = ROOT / "data" / ".cache" / "fee_overlay"
+
+_RE_NONALNUM_U = re.compile(r"[^A-Z0-9]")
+# Deletes every ASCII character outside [A-Z0-9]; mirrors _RE_NONALNUM_U for ASCII input.
+_SYMBOL_DELETE_TABLE = str.maketrans("", "", "".join(ch for ch in map(chr, range(128)) if not ("0" <= ch <= "9" or "A" <= ch <= "Z")))
+
+# Candidate files repeat a handful of venue/symbol strings across thousands of
+# rows, so each distinct string is normalized once and then served from cache.
+VALUE_CACHE_SIZE = 4096
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Overlay fee table with authenticated venue fees")
     p.add_argument("--input-candidates", type=Path, default=DEFAULT_INPUT_CANDIDATES)
     p.add_argument("--fee-table", type=Path, default=DEFAULT_FEE_TABLE)
     p.add_argument("--timeout-sec", type=float, default=8.0)
-    return p.parse_args()
+    p.add_argument(
+        "--cache-ttl-sec",
+        type=float,
+        default=1200.0,
+        help="Reuse authenticated fee responses younger than this (0 disables the cache)",
+    )
+    return p.parse_args(argv)
 
 
 def load_json(path: Path, fallback: Any) -> Any:
     if not path.exists():
         return fallback
     try:
-        return json.loads(path.read_text())
+        return json.loads(path.read_bytes())
     except Exception:
         return fallback
 
@@ -58,10 +77,51 @@ def _as_bps_from_rate(raw: Any) -> float | None:
     return round(max(0.0, value) * 10000.0, 6)
 
 
-def _http_get_json(url: str, headers: dict[str, str], timeout_sec: float) -> Any:
-    req = urllib.request.Request(url=url, headers=headers, method="GET")
-    with urllib.request.urlopen(req, timeout=timeout_sec) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+def _cache_path(key: tuple[str, ...]) -> Path:
+    digest = hashlib.sha256("\x1f".join(key).encode("utf-8")).hexdigest()[:32]
+    return DEFAULT_CACHE_DIR / f"{digest}.json"
+
+
+def _cache_get(key: tuple[str, ...], ttl_sec: float) -> Any:
+    if ttl_sec <= 0:
+        return None
+    entry = load_json(_cache_path(key), fallback=None)
+    if not isinstance(entry, dict):
+        return None
+    try:
+        fetched_at = float(entry.get("t", 0.0))
+    except (TypeError, ValueError):
+        return None
+    if time.time() - fetched_at > ttl_sec:
+        return None
+    return entry.get("v")
+
+
+def _cache_put(key: tuple[str, ...], value: Any) -> None:
+    path = _cache_path(key)
+    tmp = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps({"t": time.time(), "v": value}))
+        os.replace(tmp, path)
+    except OSError:
+        # Cache is best-effort; a read-only checkout just means no reuse next run.
+        pass
+
+
+def _account_tag(api_key: str) -> str:
+    # Cache entries are per account without writing the key itself to disk.
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _cached_fee(key: tuple[str, ...], ttl_sec: float) -> tuple[float, float] | None:
+    value = _cache_get(key, ttl_sec)
+    if not isinstance(value, list) or len(value) != 2:
+        return None
+    try:
+        return float(value[0]), float(value[1])
+    except (TypeError, ValueError):
+        return None
 
 
 def _binance_signed_get(
@@ -77,7 +137,7 @@ def _binance_signed_get(
     query = urllib.parse.urlencode(payload)
     signature = hmac.new(api_secret.encode("utf-8"), query.encode("utf-8"), hashlib.sha256).hexdigest()
     url = f"https://api.binance.com{path}?{query}&signature={signature}"
-    return _http_get_json(url, headers={"X-MBX-APIKEY": api_key}, timeout_sec=timeout_sec)
+    return http_get_json(url, timeout_sec, headers={"X-MBX-APIKEY": api_key})
 
 
 def _bybit_signed_get(
@@ -100,60 +160,64 @@ def _bybit_signed_get(
         "X-BAPI-SIGN": sign,
     }
     url = f"https://api.bybit.com{path}?{query}"
-    return _http_get_json(url, headers=headers, timeout_sec=timeout_sec)
+    return http_get_json(url, timeout_sec, headers=headers)
 
 
+@lru_cache(maxsize=VALUE_CACHE_SIZE)
 def _sanitize_symbol(raw_symbol: str) -> str:
-    raw = str(raw_symbol).strip().upper()
-    if not raw:
-        return "BTCUSDT"
-
-    if "/" in raw:
-        base, quote = raw.split("/", 1)
-        base = re.sub(r"[^A-Z0-9]", "", base)
-        quote = re.sub(r"[^A-Z0-9]", "", quote)
-        if base and quote:
-            return f"{base}{quote}"
-
-    cleaned = re.sub(r"[^A-Z0-9]", "", raw)
+    # Splitting on "/" and cleaning each side yields the same string as cleaning the
+    # whole symbol, so one pass suffices. ASCII input (every real symbol) goes
+    # through a C-level translate table; anything else keeps the regex path.
+    raw = str(raw_symbol).upper()
+    cleaned = raw.translate(_SYMBOL_DELETE_TABLE) if raw.isascii() else _RE_NONALNUM_U.sub("", raw)
     return cleaned or "BTCUSDT"
 
 
-def _collect_symbols_by_venue(candidates: list[dict[str, Any]]) -> dict[tuple[str, str], str]:
-    out: dict[tuple[str, str], str] = {}
+@lru_cache(maxsize=VALUE_CACHE_SIZE)
+def _classify_venue(venue_text: str) -> tuple[str, str] | None:
+    """Return (venue, instrument) for Binance/Bybit venue strings, None for others."""
+    lowered = venue_text.lower()
+    if "binance" in lowered:
+        venue = "binance"
+    elif "bybit" in lowered:
+        venue = "bybit"
+    else:
+        return None
+    if "perp" in lowered or "future" in lowered or "swap" in lowered or "linear" in lowered:
+        return venue, "perp"
+    return venue, "spot"
 
-    def pick_instrument(venue_text: str) -> str:
-        lowered = venue_text.lower()
-        if any(k in lowered for k in ["perp", "future", "swap", "linear"]):
-            return "perp"
-        return "spot"
 
-    def pick_venue(venue_text: str) -> str:
-        lowered = venue_text.lower()
-        if "binance" in lowered:
-            return "binance"
-        if "bybit" in lowered:
-            return "bybit"
-        return ""
+def _collect_symbols_by_venue(candidates: Iterable[Any]) -> tuple[dict[tuple[str, str], str], int]:
+    """Return ((venue, instrument) -> first symbol seen, candidates consumed)."""
+    out: dict[tuple[str, str], str] = {}
+    n_candidates = 0
 
+    # Hot loop: bind globals/methods to locals once instead of per row.
+    classify = _classify_venue
+    sanitize = _sanitize_symbol
     for item in candidates:
+        n_candidates += 1
         if not isinstance(item, dict):
             continue
-        symbol = _sanitize_symbol(str(item.get("symbol", "")))
-        for key in ["buy_venue", "sell_venue"]:
-            raw_venue = str(item.get(key, ""))
-            venue = pick_venue(raw_venue)
-            if not venue:
-                continue
-            instrument = pick_instrument(raw_venue)
-            out.setdefault((venue, instrument), symbol)
+        get = item.get
+        buy = classify(str(get("buy_venue", "")))
+        sell = classify(str(get("sell_venue", "")))
+        if buy is None and sell is None:
+            continue
+        # Only rows on a Binance/Bybit leg need their symbol cleaned.
+        symbol = sanitize(str(get("symbol", "")))
+        if buy is not None and buy not in out:
+            out[buy] = symbol
+        if sell is not None and sell not in out:
+            out[sell] = symbol
 
     out.setdefault(("binance", "spot"), "BTCUSDT")
     out.setdefault(("binance", "perp"), "BTCUSDT")
     out.setdefault(("bybit", "spot"), "BTCUSDT")
     out.setdefault(("bybit", "perp"), "BTCUSDT")
 
-    return out
+    return out, n_candidates
 
 
 def fetch_binance_spot_fee(
@@ -235,25 +299,31 @@ def fetch_bybit_fee(
     return taker_bps, maker_bps
 
 
+def _index_rules(rules: list[Any]) -> dict[tuple[str, str], dict[str, Any]]:
+    # First row wins for duplicate (venue, instrument) keys, as the old linear scan did.
+    index: dict[tuple[str, str], dict[str, Any]] = {}
+    for row in rules:
+        if not isinstance(row, dict):
+            continue
+        key = (str(row.get("venue", "")).strip().lower(), str(row.get("instrument", "")).strip().lower())
+        index.setdefault(key, row)
+    return index
+
+
 def _overlay_rule(
     rules: list[dict[str, Any]],
+    rule_index: dict[tuple[str, str], dict[str, Any]],
     venue: str,
     instrument: str,
     taker_bps: float,
     maker_bps: float,
     source: str,
 ) -> None:
-    target = None
-    for row in rules:
-        if not isinstance(row, dict):
-            continue
-        if str(row.get("venue", "")).strip().lower() == venue and str(row.get("instrument", "")).strip().lower() == instrument:
-            target = row
-            break
-
+    target = rule_index.get((venue, instrument))
     if target is None:
         target = {"venue": venue, "instrument": instrument}
         rules.append(target)
+        rule_index[(venue, instrument)] = target
 
     existing_vip = target.get("maker_vip_bps", maker_bps)
     try:
@@ -261,14 +331,17 @@ def _overlay_rule(
     except (TypeError, ValueError):
         existing_vip = maker_bps
 
-    target["taker_bps"] = round(max(0.0, float(taker_bps)), 6)
-    target["maker_bps"] = round(max(0.0, float(maker_bps)), 6)
-    target["maker_vip_bps"] = round(min(existing_vip, target["maker_bps"]), 6)
+    # Taker/maker come from _as_bps_from_rate (live or cached), already rounded to
+    # 6 dp; only a hand-edited VIP rate read from the table can need rounding.
+    maker = max(0.0, maker_bps)
+    target["taker_bps"] = max(0.0, taker_bps)
+    target["maker_bps"] = maker
+    target["maker_vip_bps"] = maker if existing_vip >= maker else round(existing_vip, 6)
     target["source"] = source
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
 
     fee_table = load_json(args.fee_table, fallback={})
     if not isinstance(fee_table, dict):
@@ -277,12 +350,13 @@ def main() -> None:
     rules = fee_table.get("rules", [])
     if not isinstance(rules, list):
         raise SystemExit("Fee table rules is not a list")
+    rule_index = _index_rules(rules)
 
-    candidates = load_json(args.input_candidates, fallback=[])
-    if not isinstance(candidates, list):
-        candidates = []
-
-    symbols = _collect_symbols_by_venue(candidates)
+    # Only the symbol/venue fields are needed, so candidates are streamed row by row.
+    try:
+        symbols, n_candidates = _collect_symbols_by_venue(iter_json_array(args.input_candidates))
+    except (OSError, TypeError, ValueError):
+        symbols, n_candidates = _collect_symbols_by_venue([])
 
     binance_key = os.getenv("BINANCE_API_KEY", "").strip()
     binance_secret = os.getenv("BINANCE_API_SECRET", "").strip()
@@ -292,103 +366,116 @@ def main() -> None:
     updated = 0
     failures: list[str] = []
 
+    # (tag, venue, instrument, symbol, api_key, fetch, source); the four signed GETs
+    # share no state, so they run concurrently and wall time is ~max(RTT) instead of the sum.
+    jobs: list[tuple[str, str, str, str, str, Callable[[str], tuple[float, float] | None], str]] = []
     if binance_key and binance_secret:
-        try:
-            spot_symbol = symbols.get(("binance", "spot"), "BTCUSDT")
-            spot_fee = fetch_binance_spot_fee(spot_symbol, binance_key, binance_secret, timeout_sec=args.timeout_sec)
-            if spot_fee is not None:
-                _overlay_rule(
-                    rules,
-                    venue="binance",
-                    instrument="spot",
-                    taker_bps=spot_fee[0],
-                    maker_bps=spot_fee[1],
-                    source="binance_authenticated_api",
-                )
-                updated += 1
-            else:
-                failures.append("binance_spot_no_data")
-        except urllib.error.HTTPError as e:
-            failures.append(f"binance_spot_http_{e.code}")
-        except Exception:
-            failures.append("binance_spot_error")
-
-        try:
-            perp_symbol = symbols.get(("binance", "perp"), "BTCUSDT")
-            perp_fee = fetch_binance_perp_fee(perp_symbol, binance_key, binance_secret, timeout_sec=args.timeout_sec)
-            if perp_fee is not None:
-                _overlay_rule(
-                    rules,
-                    venue="binance",
-                    instrument="perp",
-                    taker_bps=perp_fee[0],
-                    maker_bps=perp_fee[1],
-                    source="binance_authenticated_api",
-                )
-                updated += 1
-            else:
-                failures.append("binance_perp_no_data")
-        except urllib.error.HTTPError as e:
-            failures.append(f"binance_perp_http_{e.code}")
-        except Exception:
-            failures.append("binance_perp_error")
+        jobs.append(
+            (
+                "binance_spot",
+                "binance",
+                "spot",
+                symbols.get(("binance", "spot"), "BTCUSDT"),
+                binance_key,
+                lambda symbol: fetch_binance_spot_fee(symbol, binance_key, binance_secret, timeout_sec=args.timeout_sec),
+                "binance_authenticated_api",
+            )
+        )
+        jobs.append(
+            (
+                "binance_perp",
+                "binance",
+                "perp",
+                symbols.get(("binance", "perp"), "BTCUSDT"),
+                binance_key,
+                lambda symbol: fetch_binance_perp_fee(symbol, binance_key, binance_secret, timeout_sec=args.timeout_sec),
+                "binance_authenticated_api",
+            )
+        )
     else:
         failures.append("binance_auth_missing")
 
     if bybit_key and bybit_secret:
-        try:
-            spot_symbol = symbols.get(("bybit", "spot"), "BTCUSDT")
-            spot_fee = fetch_bybit_fee("spot", spot_symbol, bybit_key, bybit_secret, timeout_sec=args.timeout_sec)
-            if spot_fee is not None:
-                _overlay_rule(
-                    rules,
-                    venue="bybit",
-                    instrument="spot",
-                    taker_bps=spot_fee[0],
-                    maker_bps=spot_fee[1],
-                    source="bybit_authenticated_api",
-                )
-                updated += 1
-            else:
-                failures.append("bybit_spot_no_data")
-        except urllib.error.HTTPError as e:
-            failures.append(f"bybit_spot_http_{e.code}")
-        except Exception:
-            failures.append("bybit_spot_error")
-
-        try:
-            perp_symbol = symbols.get(("bybit", "perp"), "BTCUSDT")
-            perp_fee = fetch_bybit_fee("linear", perp_symbol, bybit_key, bybit_secret, timeout_sec=args.timeout_sec)
-            if perp_fee is not None:
-                _overlay_rule(
-                    rules,
-                    venue="bybit",
-                    instrument="perp",
-                    taker_bps=perp_fee[0],
-                    maker_bps=perp_fee[1],
-                    source="bybit_authenticated_api",
-                )
-                updated += 1
-            else:
-                failures.append("bybit_perp_no_data")
-        except urllib.error.HTTPError as e:
-            failures.append(f"bybit_perp_http_{e.code}")
-        except Exception:
-            failures.append("bybit_perp_error")
+        jobs.append(
+            (
+                "bybit_spot",
+                "bybit",
+                "spot",
+                symbols.get(("bybit", "spot"), "BTCUSDT"),
+                bybit_key,
+                lambda symbol: fetch_bybit_fee("spot", symbol, bybit_key, bybit_secret, timeout_sec=args.timeout_sec),
+                "bybit_authenticated_api",
+            )
+        )
+        jobs.append(
+            (
+                "bybit_perp",
+                "bybit",
+                "perp",
+                symbols.get(("bybit", "perp"), "BTCUSDT"),
+                bybit_key,
+                lambda symbol: fetch_bybit_fee("linear", symbol, bybit_key, bybit_secret, timeout_sec=args.timeout_sec),
+                "bybit_authenticated_api",
+            )
+        )
     else:
         failures.append("bybit_auth_missing")
 
+    # Account fee tiers move over hours/days; a fresh cached (taker, maker) pair
+    # skips the signed call entirely.
+    cache_keys = [
+        (venue, instrument, _account_tag(api_key), symbol) for _, venue, instrument, symbol, api_key, _, _ in jobs
+    ]
+    cached_fees = [_cached_fee(key, args.cache_ttl_sec) for key in cache_keys]
+
+    futures: dict[int, Any] = {}
+    if any(fee is None for fee in cached_fees):
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {
+                i: pool.submit(job[5], job[3]) for i, job in enumerate(jobs) if cached_fees[i] is None
+            }
+
+    # Fold in submission order so new rules are appended deterministically.
+    for i, (tag, venue, instrument, _, _, _, source) in enumerate(jobs):
+        fee = cached_fees[i]
+        if fee is None:
+            try:
+                fee = futures[i].result()
+            except urllib.error.HTTPError as e:
+                failures.append(f"{tag}_http_{e.code}")
+                continue
+            except Exception:
+                failures.append(f"{tag}_error")
+                continue
+
+            if fee is None:
+                failures.append(f"{tag}_no_data")
+                continue
+            _cache_put(cache_keys[i], list(fee))
+
+        _overlay_rule(
+            rules,
+            rule_index,
+            venue=venue,
+            instrument=instrument,
+            taker_bps=fee[0],
+            maker_bps=fee[1],
+            source=source,
+        )
+        updated += 1
+
     fee_table["generated_at"] = datetime.now(timezone.utc).isoformat()
     fee_table["version"] = "execution_fee_table_v1"
+    # The key only reads the rules; their venue/instrument values are written as-is.
     fee_table["rules"] = sorted(
         [row for row in rules if isinstance(row, dict)],
         key=lambda row: (str(row.get("venue", "")), str(row.get("instrument", ""))),
     )
 
     args.fee_table.parent.mkdir(parents=True, exist_ok=True)
-    args.fee_table.write_text(json.dumps(fee_table, indent=2))
+    atomic_write_bytes(args.fee_table, json.dumps(fee_table, indent=2).encode("utf-8"))
 
-    print(f"Candidates loaded: {len(candidates)}")
+    print(f"Candidates loaded: {n_candidates}")
     print(f"Fee rules total: {len(fee_table['rules'])}")
     print(f"Authenticated rules updated: {updated}")
     if failures:
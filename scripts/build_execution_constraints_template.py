@@ -18,10 +18,12 @@ from __future__ import annotations
 import argparse
 import json
 import re
-from collections import defaultdict
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
+
+from _fileio import atomic_write_bytes, iter_json_array
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_INPUT = ROOT / "data" / "opportunity_candidates.combined.live.json"
@@ -41,29 +43,39 @@ DEFAULT_STRATEGY_LEVERAGE_NOTIONAL_MULTIPLIER = {
     "perp_spot_basis": 1.25,
 }
 
-VENUE_STOPWORDS = {
-    "long",
-    "short",
-    "spot",
-    "perp",
-    "futures",
-    "future",
-    "swap",
-    "dex",
-    "cex",
-    "buy",
-    "sell",
-}
+VENUE_STOPWORDS = frozenset(
+    {
+        "long",
+        "short",
+        "spot",
+        "perp",
+        "futures",
+        "future",
+        "swap",
+        "dex",
+        "cex",
+        "buy",
+        "sell",
+    }
+)
+
+CORE_ASSETS = frozenset({"BTC", "ETH", "SOL"})
 
-CORE_ASSETS = {"BTC", "ETH", "SOL"}
+_RE_NONALNUM_L_SPLIT = re.compile(r"[^a-z0-9]+")
+_RE_NONALNUM_U_SPLIT = re.compile(r"[^A-Z0-9]+")
 
+# Candidate files repeat a handful of venue/symbol strings across thousands of
+# rows, so each distinct string is normalized once and then served from cache.
+VALUE_CACHE_SIZE = 4096
 
+
+@lru_cache(maxsize=VALUE_CACHE_SIZE)
 def canonical_venue(raw_venue: str) -> str:
     lowered = str(raw_venue).strip().lower()
     if not lowered:
         return "unknown"
 
-    tokens = [t for t in re.split(r"[^a-z0-9]+", lowered) if t]
+    tokens = [t for t in _RE_NONALNUM_L_SPLIT.split(lowered) if t]
     for token in tokens:
         if token not in VENUE_STOPWORDS:
             return token
@@ -71,11 +83,12 @@ def canonical_venue(raw_venue: str) -> str:
     return lowered
 
 
+@lru_cache(maxsize=VALUE_CACHE_SIZE)
 def asset_from_symbol(symbol: str) -> str:
     raw = str(symbol).strip().upper()
     if "/" in raw:
         return raw.split("/")[0].strip() or "UNKNOWN"
-    parts = [p for p in re.split(r"[^A-Z0-9]+", raw) if p]
+    parts = [p for p in _RE_NONALNUM_U_SPLIT.split(raw) if p]
     return parts[0] if parts else "UNKNOWN"
 
 
@@ -83,11 +96,44 @@ def load_json(path: Path, fallback: Any) -> Any:
     if not path.exists():
         return fallback
     try:
-        return json.loads(path.read_text())
+        return json.loads(path.read_bytes())
     except Exception:
         return fallback
 
 
+def collect_sizes(candidates: Iterable[Any]) -> tuple[int, dict[tuple[str, str], float]]:
+    """Return (candidates consumed, max size per (venue, asset)) in a single pass."""
+    n_candidates = 0
+    # Only the largest size per key feeds suggest_limits, so keep a running max.
+    max_size_by_key: dict[tuple[str, str], float] = {}
+    # Hot loop: bind globals/methods to locals once instead of per row.
+    venue_of = canonical_venue
+    asset_of = asset_from_symbol
+    current_max = max_size_by_key.get
+    for item in candidates:
+        n_candidates += 1
+        if not isinstance(item, dict):
+            continue
+        get = item.get
+        try:
+            size = float(get("size_usd", 0) or 0)
+        except (TypeError, ValueError):
+            size = 0.0
+        if size <= 0:
+            continue
+
+        # str() up front keeps the cached helpers keyed on hashable values.
+        asset = asset_of(str(get("symbol", "")))
+        for key in (
+            (venue_of(str(get("buy_venue", ""))), asset),
+            (venue_of(str(get("sell_venue", ""))), asset),
+        ):
+            cur = current_max(key)
+            if cur is None or size > cur:
+                max_size_by_key[key] = size
+    return n_candidates, max_size_by_key
+
+
 def suggest_limits(max_size_usd: float, asset: str) -> dict[str, float]:
     baseline = max(1000.0, max_size_usd)
 
@@ -111,18 +157,22 @@ def suggest_limits(max_size_usd: float, asset: str) -> dict[str, float]:
     }
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build execution constraints template from candidates")
     p.add_argument("--input", type=Path, default=DEFAULT_INPUT)
     p.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
-def main() -> None:
-    args = parse_args()
-    candidates = load_json(args.input, fallback=[])
-    if not isinstance(candidates, list):
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    # Candidates are streamed: only size/symbol/venues are kept per row.
+    try:
+        n_candidates, max_size_by_key = collect_sizes(iter_json_array(args.input))
+    except TypeError:
         raise SystemExit(f"Input is not a candidate list: {args.input}")
+    except (OSError, ValueError):
+        n_candidates, max_size_by_key = collect_sizes([])
 
     existing = load_json(args.output, fallback={})
     if not isinstance(existing, dict):
@@ -137,33 +187,14 @@ def main() -> None:
         if venue and asset:
             existing_rules[(venue, asset)] = row
 
-    sizes_by_key: dict[tuple[str, str], list[float]] = defaultdict(list)
-    for item in candidates:
-        if not isinstance(item, dict):
-            continue
-        try:
-            size = float(item.get("size_usd", 0) or 0)
-        except (TypeError, ValueError):
-            size = 0.0
-        if size <= 0:
-            continue
-
-        asset = asset_from_symbol(item.get("symbol", ""))
-        buy_venue = canonical_venue(item.get("buy_venue", ""))
-        sell_venue = canonical_venue(item.get("sell_venue", ""))
-
-        sizes_by_key[(buy_venue, asset)].append(size)
-        sizes_by_key[(sell_venue, asset)].append(size)
-
     merged_rules: list[dict[str, Any]] = []
-    for venue, asset in sorted(sizes_by_key.keys()):
+    for venue, asset in sorted(max_size_by_key.keys()):
         key = (venue, asset)
         if key in existing_rules:
             merged_rules.append(existing_rules[key])
             continue
 
-        max_size = max(sizes_by_key[key])
-        suggested = suggest_limits(max_size, asset)
+        suggested = suggest_limits(max_size_by_key[key], asset)
         merged_rules.append(
             {
                 "venue": venue,
@@ -174,7 +205,7 @@ def main() -> None:
 
     # Keep legacy/manual entries that are no longer in current candidate universe.
     for key, row in sorted(existing_rules.items()):
-        if key not in sizes_by_key:
+        if key not in max_size_by_key:
             merged_rules.append(row)
 
     # Backfill newly introduced fields for legacy rows.
@@ -220,9 +251,9 @@ def main() -> None:
     }
 
     args.output.parent.mkdir(parents=True, exist_ok=True)
-    args.output.write_text(json.dumps(out, indent=2))
+    atomic_write_bytes(args.output, json.dumps(out, indent=2).encode("utf-8"))
 
-    print(f"Loaded candidates: {len(candidates)}")
+    print(f"Loaded candidates: {n_candidates}")
     print(f"Constraint rules: {len(merged_rules)}")
     print(f"Wrote: {args.output}")
 
@@ -12,32 +12,35 @@ import argparse
 import json
 import re
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
+
+from _fileio import atomic_write_bytes, iter_json_array
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_INPUT = ROOT / "data" / "opportunity_candidates.combined.live.json"
 DEFAULT_OUTPUT = ROOT / "data" / "execution_fee_table.latest.json"
 
-VENUE_STOPWORDS = {
-    "long",
-    "short",
-    "spot",
-    "perp",
-    "futures",
-    "future",
-    "swap",
-    "dex",
-    "cex",
-    "buy",
-    "sell",
-}
+VENUE_STOPWORDS = frozenset(
+    {
+        "long",
+        "short",
+        "spot",
+        "perp",
+        "futures",
+        "future",
+        "swap",
+        "dex",
+        "cex",
+        "buy",
+        "sell",
+    }
+)
 
-INSTRUMENT_KEYWORDS = {
-    "perp": {"perp", "future", "futures", "swap"},
-    "dex": {"dex", "jupiter", "uniswap", "raydium", "0x", "orca"},
-    "spot": {"spot"},
-}
+PERP_KEYWORDS = frozenset({"perp", "future", "futures", "swap"})
+DEX_KEYWORDS = frozenset({"dex", "jupiter", "uniswap", "raydium", "0x", "orca"})
+SPOT_KEYWORDS = frozenset({"spot"})
 
 DEFAULT_PROFILE_FEE_MODE = {
     "taker_default": "taker",
@@ -67,38 +70,41 @@ VENUE_BASELINES: dict[tuple[str, str], dict[str, float]] = {
     ("jupiter", "dex"): {"taker_bps": 6.0, "maker_bps": 6.0, "maker_vip_bps": 5.0},
 }
 
+_RE_NONALNUM_L_SPLIT = re.compile(r"[^a-z0-9]+")
 
-def canonical_venue(raw_venue: str) -> str:
-    lowered = str(raw_venue).strip().lower()
-    if not lowered:
-        return "unknown"
+# Candidate files repeat a handful of venue/symbol strings across thousands of
+# rows, so each distinct string is normalized once and then served from cache.
+VALUE_CACHE_SIZE = 4096
 
-    tokens = [t for t in re.split(r"[^a-z0-9]+", lowered) if t]
-    for token in tokens:
-        if token not in VENUE_STOPWORDS:
-            return token
 
-    return lowered
-
-
-def instrument_from_venue(raw_venue: str) -> str:
+@lru_cache(maxsize=VALUE_CACHE_SIZE)
+def classify_venue(raw_venue: str) -> tuple[str, str]:
+    """Return (canonical venue, instrument) from one lowercase + tokenization pass."""
     lowered = str(raw_venue).strip().lower()
     if not lowered:
-        return "unknown"
+        return "unknown", "unknown"
 
-    tokens = [t for t in re.split(r"[^a-z0-9]+", lowered) if t]
-    token_set = set(tokens)
+    tokens = [t for t in _RE_NONALNUM_L_SPLIT.split(lowered) if t]
 
-    if token_set & INSTRUMENT_KEYWORDS["perp"]:
-        return "perp"
-    if token_set & INSTRUMENT_KEYWORDS["dex"]:
-        return "dex"
-    if token_set & INSTRUMENT_KEYWORDS["spot"]:
-        return "spot"
-
-    if "jupiter" in lowered or "uniswap" in lowered:
-        return "dex"
-    return "spot"
+    venue = lowered
+    for token in tokens:
+        if token not in VENUE_STOPWORDS:
+            venue = token
+            break
+
+    # isdisjoint walks the short token list against the frozenset without
+    # building a per-call set.
+    if not PERP_KEYWORDS.isdisjoint(tokens):
+        instrument = "perp"
+    elif not DEX_KEYWORDS.isdisjoint(tokens):
+        instrument = "dex"
+    elif not SPOT_KEYWORDS.isdisjoint(tokens):
+        instrument = "spot"
+    elif "jupiter" in lowered or "uniswap" in lowered:
+        instrument = "dex"
+    else:
+        instrument = "spot"
+    return venue, instrument
 
 
 def _as_non_negative(value: Any, fallback: float) -> float:
@@ -112,16 +118,35 @@ def load_json(path: Path, fallback: Any) -> Any:
     if not path.exists():
         return fallback
     try:
-        return json.loads(path.read_text())
+        return json.loads(path.read_bytes())
     except Exception:
         return fallback
 
 
-def parse_args() -> argparse.Namespace:
+def collect_venue_pairs(candidates: Iterable[Any]) -> tuple[int, set[tuple[str, str]]]:
+    """Return (candidates consumed, distinct (venue, instrument) pairs) in a single pass."""
+    n_candidates = 0
+    seen_pairs: set[tuple[str, str]] = set()
+    # Hot loop: bind globals/methods to locals once instead of per row.
+    classify = classify_venue
+    add_pair = seen_pairs.add
+    for item in candidates:
+        n_candidates += 1
+        if not isinstance(item, dict):
+            continue
+
+        # str() up front keeps the cached classifier keyed on hashable values.
+        get = item.get
+        add_pair(classify(str(get("buy_venue", ""))))
+        add_pair(classify(str(get("sell_venue", ""))))
+    return n_candidates, seen_pairs
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build execution fee table template from candidates")
     p.add_argument("--input", type=Path, default=DEFAULT_INPUT)
     p.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
 def baseline_for(venue: str, instrument: str) -> dict[str, float]:
@@ -131,12 +156,16 @@ def baseline_for(venue: str, instrument: str) -> dict[str, float]:
     return dict(DEFAULT_INSTRUMENT_FEES.get(instrument, DEFAULT_INSTRUMENT_FEES["unknown"]))
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
 
-    candidates = load_json(args.input, fallback=[])
-    if not isinstance(candidates, list):
+    # Candidates are streamed: only the venue fields are kept per row.
+    try:
+        n_candidates, seen_pairs = collect_venue_pairs(iter_json_array(args.input))
+    except TypeError:
         raise SystemExit(f"Input is not a candidate list: {args.input}")
+    except (OSError, ValueError):
+        n_candidates, seen_pairs = collect_venue_pairs([])
 
     existing = load_json(args.output, fallback={})
     if not isinstance(existing, dict):
@@ -151,23 +180,12 @@ def main() -> None:
         if venue:
             existing_rules[(venue, instrument)] = row
 
-    seen_pairs: set[tuple[str, str]] = set()
-    for item in candidates:
-        if not isinstance(item, dict):
-            continue
-
-        buy_venue = canonical_venue(item.get("buy_venue", ""))
-        buy_instr = instrument_from_venue(item.get("buy_venue", ""))
-        sell_venue = canonical_venue(item.get("sell_venue", ""))
-        sell_instr = instrument_from_venue(item.get("sell_venue", ""))
-
-        seen_pairs.add((buy_venue, buy_instr))
-        seen_pairs.add((sell_venue, sell_instr))
-
     merged_rules: list[dict[str, Any]] = []
     for key in sorted(seen_pairs):
-        if key in existing_rules:
-            merged_rules.append(existing_rules[key])
+        # Pop matched rows so only the manual leftovers remain afterwards.
+        row = existing_rules.pop(key, None)
+        if row is not None:
+            merged_rules.append(row)
             continue
 
         venue, instrument = key
@@ -182,9 +200,7 @@ def main() -> None:
         )
 
     # Keep manual entries even if current universe doesn't contain them.
-    for key, row in sorted(existing_rules.items()):
-        if key not in seen_pairs:
-            merged_rules.append(row)
+    merged_rules.extend(existing_rules[key] for key in sorted(existing_rules))
 
     defaults = existing.get("defaults", {}) if isinstance(existing.get("defaults"), dict) else {}
     defaults_out: dict[str, Any] = {}
@@ -221,9 +237,9 @@ def main() -> None:
     }
 
     args.output.parent.mkdir(parents=True, exist_ok=True)
-    args.output.write_text(json.dumps(out, indent=2))
+    atomic_write_bytes(args.output, json.dumps(out, indent=2).encode("utf-8"))
 
-    print(f"Loaded candidates: {len(candidates)}")
+    print(f"Loaded candidates: {n_candidates}")
     print(f"Fee rules: {len(merged_rules)}")
     print(f"Wrote: {args.output}")
 
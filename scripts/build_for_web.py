@@ -3,31 +3,221 @@
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import importlib
+import io
 import json
-import subprocess
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, List, Optional, TextIO, Tuple
 
 ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS_DIR = ROOT / "scripts"
 
+_PRINT_LOCK = threading.Lock()
+# Per-thread capture buffer for in-process steps run by run_chains.
+_CAPTURE = threading.local()
 
-def run(cmd: list[str], allow_fail: bool = False) -> None:
-    print("$", " ".join(cmd))
-    res = subprocess.run(cmd, cwd=ROOT)
-    if res.returncode != 0 and not allow_fail:
-        raise SystemExit(res.returncode)
+WEB_BUILD_CACHE_DIR = ROOT / "data" / ".cache" / "web_build"
+# Digest of everything the scan + site steps read, from the last run that built them.
+SCAN_INPUTS_STAMP = WEB_BUILD_CACHE_DIR / "scan_inputs.sha256"
+# Small dict payloads re-stamped with generated_at on every run; every other input,
+# the merged candidates included, is hashed as raw bytes.
+GENERATED_AT_STAMPED = frozenset({"execution_constraints.latest.json", "execution_fee_table.latest.json"})
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Build full web dashboard bundle")
+    p.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-run the template, scoring and site steps even if their inputs are unchanged",
+    )
+    return p.parse_args()
+
+
+def run_script(script: str, argv: list[str], allow_fail: bool = False) -> bool:
+    """Run scripts/<script>.py's main(argv) in this interpreter; True if it succeeded.
+
+    Saves a fresh interpreter start + imports per step. Exit codes mirror the old
+    subprocess run: a non-zero SystemExit (or an uncaught error) fails the build
+    unless allow_fail is set. argv is passed explicitly rather than via sys.argv,
+    so independent steps can run on separate threads.
+    """
+    print("$", "python3", f"scripts/{script}.py", *argv, flush=True)
+    try:
+        # Imported inside the try so a module that fails to load (e.g. on an older
+        # interpreter) honours allow_fail like a failing main() does.
+        importlib.import_module(script).main(argv)
+    except SystemExit as exc:
+        code = exc.code
+        if code is None or code == 0:
+            return True
+        if not isinstance(code, int):
+            print(code, file=sys.stderr)
+            code = 1
+        if not allow_fail:
+            raise SystemExit(code)
+        return False
+    except Exception:
+        if not allow_fail:
+            raise
+        traceback.print_exc()
+        return False
+    finally:
+        sys.stdout.flush()
+    return True
+
+
+def run_cached_script(
+    script: str,
+    argv: list[str],
+    cache_inputs: list[Path],
+    output: Path | None = None,
+    allow_fail: bool = False,
+    force: bool = False,
+) -> None:
+    """run_script, skipped while cache_inputs are exactly as this step last left them.
+
+    cache_inputs must include the step's own output when it merges into it (the
+    templates do), passed again as output: the stamp is taken after the run, so any
+    later edit to that file, e.g. by an authenticated overlay, makes the next build
+    re-run the step. Only output is re-hashed after the run; the other inputs are
+    hashed once.
+    """
+    stamp = WEB_BUILD_CACHE_DIR / f"{script}.sha256"
+    digests = file_digests([*cache_inputs, SCRIPTS_DIR / f"{script}.py"])
+    if not force and stamp.exists() and stamp.read_text().strip() == inputs_digest(digests):
+        print(f"cached: scripts/{script}.py (inputs unchanged since its last run)", flush=True)
+        return
+    if run_script(script, argv, allow_fail=allow_fail):
+        if output is not None:
+            digests[output] = _stable_digest(output)
+        stamp.parent.mkdir(parents=True, exist_ok=True)
+        stamp.write_text(inputs_digest(digests) + "\n")
+
+
+def _stable_digest(path: Path) -> bytes:
+    if not path.exists():
+        return b"missing"
+    if path.name in GENERATED_AT_STAMPED:
+        # Template/overlay steps stamp generated_at on every run; ignore it so an
+        # otherwise identical file hashes the same.
+        try:
+            payload = json.loads(path.read_bytes())
+        except ValueError:
+            payload = None
+        if isinstance(payload, dict):
+            payload.pop("generated_at", None)
+            return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).digest()
+    with path.open("rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").digest()
+        # Python < 3.11: same streamed hash, chunk by chunk.
+        h = hashlib.sha256()
+        while chunk := f.read(1 << 16):
+            h.update(chunk)
+        return h.digest()
+
+
+def file_digests(paths: list[Path]) -> dict[Path, bytes]:
+    return {path: _stable_digest(path) for path in paths}
+
+
+def inputs_digest(digests: dict[Path, bytes]) -> str:
+    h = hashlib.sha256()
+    for path, digest in digests.items():
+        h.update(str(path.relative_to(ROOT)).encode("utf-8"))
+        h.update(digest)
+    return h.hexdigest()
+
+
+class _ThreadRoutedStream:
+    """sys.stdout/sys.stderr stand-in that sends a capturing thread's writes to its buffer."""
+
+    def __init__(self, target: TextIO) -> None:
+        self._target = target
+
+    def write(self, text: str) -> int:
+        buffer = getattr(_CAPTURE, "buffer", None)
+        return (buffer if buffer is not None else self._target).write(text)
+
+    def flush(self) -> None:
+        if getattr(_CAPTURE, "buffer", None) is None:
+            self._target.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target, name)
+
+
+# (script, argv, allow_fail, cache_inputs, output); cache_inputs None means always run.
+# Spelled with typing generics: the alias is evaluated at import, and vercel.json
+# runs whatever python3 the build image ships.
+ChainStep = Tuple[str, List[str], bool, Optional[List[Path]], Optional[Path]]
+
+
+def _run_chain(steps: list[ChainStep], force: bool) -> None:
+    # Each step's output is captured and printed whole once it ends, so concurrent
+    # chains do not interleave their logs line by line.
+    for script, argv, allow_fail, cache_inputs, output in steps:
+        _CAPTURE.buffer = io.StringIO()
+        try:
+            if cache_inputs is None:
+                run_script(script, argv, allow_fail=allow_fail)
+            else:
+                run_cached_script(script, argv, cache_inputs, output, allow_fail=allow_fail, force=force)
+        finally:
+            output = _CAPTURE.buffer.getvalue()
+            _CAPTURE.buffer = None
+            with _PRINT_LOCK:
+                print(output, end="", flush=True)
+
+
+def run_chains(chains: list[list[ChainStep]], force: bool = False) -> None:
+    """Run independent in-process chains concurrently; steps within a chain keep their order.
+
+    A failing step without allow_fail re-raises its SystemExit here once joined.
+    """
+    saved_streams = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = _ThreadRoutedStream(sys.stdout), _ThreadRoutedStream(sys.stderr)
+    try:
+        with ThreadPoolExecutor(max_workers=len(chains)) as pool:
+            for future in [pool.submit(_run_chain, chain, force) for chain in chains]:
+                future.result()
+    finally:
+        sys.stdout, sys.stderr = saved_streams
 
 
 def main() -> None:
-    run(["python3", "scripts/build_live_cex_candidates.py"], allow_fail=True)
-    run(["python3", "scripts/build_network_friction.py"], allow_fail=True)
-    run(["python3", "scripts/build_live_cex_dex_candidates.py"], allow_fail=True)
-    run(["python3", "scripts/build_live_funding_candidates.py"], allow_fail=True)
-    run(["python3", "scripts/build_live_basis_candidates.py"], allow_fail=True)
+    args = parse_args()
+    # Step arguments are repo-relative paths, as they were with cwd=ROOT.
+    os.chdir(ROOT)
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+
+    # Live builders write disjoint files and only meet at the merge step; the CEX-DEX
+    # builder reads network_friction.latest.json, so it stays behind that step.
+    # Every live step is allow_fail: a venue outage falls back to committed data.
+    run_chains(
+        [
+            [("build_live_cex_candidates", [], True, None, None)],
+            [
+                ("build_network_friction", [], True, None, None),
+                ("build_live_cex_dex_candidates", [], True, None, None),
+            ],
+            [("build_live_funding_candidates", [], True, None, None)],
+            [("build_live_basis_candidates", [], True, None, None)],
+        ]
+    )
 
-    run(
+    run_script(
+        "merge_candidate_files",
         [
-            "python3",
-            "scripts/merge_candidate_files.py",
             "--inputs",
             "data/opportunity_candidates.live.json",
             "data/opportunity_candidates.cex_dex.live.json",
@@ -35,7 +225,7 @@ def main() -> None:
             "data/opportunity_candidates.basis.live.json",
             "--output",
             "data/opportunity_candidates.combined.live.json",
-        ]
+        ],
     )
 
     merged = ROOT / "data/opportunity_candidates.combined.live.json"
@@ -43,8 +233,9 @@ def main() -> None:
     fee_table = ROOT / "data/execution_fee_table.latest.json"
     sample = ROOT / "data/opportunity_candidates.sample.json"
 
+    # A full parse: a truncated or malformed merged file must get the fallback too.
     try:
-        payload = json.loads(merged.read_text()) if merged.exists() else []
+        payload = json.loads(merged.read_bytes()) if merged.exists() else []
     except Exception:
         payload = []
 
@@ -54,47 +245,64 @@ def main() -> None:
     else:
         print(f"Merged candidates: {len(payload)}")
 
-    run(
-        [
-            "python3",
-            "scripts/build_execution_constraints_template.py",
-            "--input",
-            "data/opportunity_candidates.combined.live.json",
-            "--output",
-            "data/execution_constraints.latest.json",
-        ]
-    )
-    run(
-        [
-            "python3",
-            "scripts/build_authenticated_constraints.py",
-            "--constraints",
-            "data/execution_constraints.latest.json",
-            "--quotes",
-            "data/normalized_quotes_cex_latest.json",
-        ],
-        allow_fail=True,
-    )
-    run(
-        [
-            "python3",
-            "scripts/build_execution_fee_table_template.py",
-            "--input",
-            "data/opportunity_candidates.combined.live.json",
-            "--output",
-            "data/execution_fee_table.latest.json",
-        ]
-    )
-    run(
+    # The constraints and fee chains read the merged candidates and write separate
+    # files; within each chain the authenticated overlay edits the template output.
+    run_chains(
         [
-            "python3",
-            "scripts/build_authenticated_fee_table.py",
-            "--input-candidates",
-            "data/opportunity_candidates.combined.live.json",
-            "--fee-table",
-            "data/execution_fee_table.latest.json",
+            [
+                (
+                    "build_execution_constraints_template",
+                    [
+                        "--input",
+                        "data/opportunity_candidates.combined.live.json",
+                        "--output",
+                        "data/execution_constraints.latest.json",
+                    ],
+                    False,
+                    [merged, constraints],
+                    constraints,
+                ),
+                (
+                    "build_authenticated_constraints",
+                    [
+                        "--constraints",
+                        "data/execution_constraints.latest.json",
+                        "--quotes",
+                        "data/normalized_quotes_cex_latest.json",
+                    ],
+                    True,
+                    None,
+                    None,
+                ),
+            ],
+            [
+                (
+                    "build_execution_fee_table_template",
+                    [
+                        "--input",
+                        "data/opportunity_candidates.combined.live.json",
+                        "--output",
+                        "data/execution_fee_table.latest.json",
+                    ],
+                    False,
+                    [merged, fee_table],
+                    fee_table,
+                ),
+                (
+                    "build_authenticated_fee_table",
+                    [
+                        "--input-candidates",
+                        "data/opportunity_candidates.combined.live.json",
+                        "--fee-table",
+                        "data/execution_fee_table.latest.json",
+                    ],
+                    True,
+                    None,
+                    None,
+                ),
+            ],
         ],
-        allow_fail=True,
+        force=args.force,
     )
 
     if constraints.exists():
@@ -102,10 +310,40 @@ def main() -> None:
     if fee_table.exists():
         print(f"Execution fee table: {fee_table}")
 
-    run(
+    shortlist = ROOT / "opportunities/shortlist-latest.json"
+    dashboard = ROOT / "opportunities/dashboard-latest.md"
+    rejection_summary = ROOT / "opportunities/rejection-summary-latest.json"
+    # The scan writes the rejection summary alongside the shortlist; it is hashed
+    # as the scan left it, so an edit to it alone also triggers a rebuild.
+    scan_digests = file_digests(
+        [
+            merged,
+            constraints,
+            fee_table,
+            rejection_summary,
+            ROOT / "scripts/scan_opportunities.py",
+            ROOT / "scripts/build_pages_site.py",
+        ]
+    )
+    scan_digest = inputs_digest(scan_digests)
+    outputs_present = (
+        shortlist.exists()
+        and dashboard.exists()
+        and rejection_summary.exists()
+        and (ROOT / "site/index.html").exists()
+    )
+    if (
+        not args.force
+        and outputs_present
+        and SCAN_INPUTS_STAMP.exists()
+        and SCAN_INPUTS_STAMP.read_text().strip() == scan_digest
+    ):
+        print("Scan inputs unchanged since last build; skipping scoring and site build")
+        return
+
+    run_script(
+        "scan_opportunities",
         [
-            "python3",
-            "scripts/scan_opportunities.py",
             "--input",
             "data/opportunity_candidates.combined.live.json",
             "--constraints",
@@ -118,22 +356,27 @@ def main() -> None:
             "opportunities/shortlist-latest.json",
             "--output-md",
             "opportunities/dashboard-latest.md",
-        ]
+            "--output-summary",
+            "opportunities/rejection-summary-latest.json",
+        ],
     )
 
-    run(
+    run_script(
+        "build_pages_site",
         [
-            "python3",
-            "scripts/build_pages_site.py",
             "--shortlist",
             "opportunities/shortlist-latest.json",
             "--dashboard",
             "opportunities/dashboard-latest.md",
             "--out-dir",
             "site",
-        ]
+        ],
     )
 
+    scan_digests[rejection_summary] = _stable_digest(rejection_summary)
+    SCAN_INPUTS_STAMP.parent.mkdir(parents=True, exist_ok=True)
+    SCAN_INPUTS_STAMP.write_text(inputs_digest(scan_digests) + "\n")
+
 
 if __name__ == "__main__":
     main()
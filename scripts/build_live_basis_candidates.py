@@ -15,11 +15,16 @@ from __future__ import annotations
 
 import argparse
 import json
-import urllib.request
-from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
 from datetime import datetime, timezone
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
 
+from _fileio import atomic_write_bytes
+from _http import DEFAULT_HTTP_CACHE_TTL_SEC, http_get_json_cached
+
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_BASIS_OUT = ROOT / "data" / "normalized_basis_latest.json"
 DEFAULT_CANDIDATES_OUT = ROOT / "data" / "opportunity_candidates.basis.live.json"
@@ -62,8 +67,14 @@ PERP_SLIPPAGE_PER_SIDE_BPS = {
     "bybit": 1.8,
 }
 
+# Entry + exit on both legs, per venue; constant for a run, so folded once here.
+ROUNDTRIP_FEES_BPS = {v: 2 * (SPOT_TAKER_FEE_BPS[v] + PERP_TAKER_FEE_BPS[v]) for v in SPOT_TAKER_FEE_BPS}
+ROUNDTRIP_SLIPPAGE_BPS = {
+    v: 2 * (SPOT_SLIPPAGE_PER_SIDE_BPS[v] + PERP_SLIPPAGE_PER_SIDE_BPS[v]) for v in SPOT_SLIPPAGE_PER_SIDE_BPS
+}
+
 
-@dataclass
+@dataclass(slots=True)
 class BasisQuote:
     detected_at: str
     venue: str
@@ -85,10 +96,7 @@ class BasisQuote:
     minutes_to_funding: float
 
 
-def _http_get_json(url: str, timeout: int = 12) -> dict | list:
-    req = urllib.request.Request(url, headers={"User-Agent": "master-trading-intel/0.1"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+_BASIS_QUOTE_FIELDS = tuple(f.name for f in fields(BasisQuote))
 
 
 def _safe_float(value: str | float | int) -> float | None:
@@ -114,6 +122,9 @@ def _parse_symbol(symbol: str) -> tuple[str, str] | None:
     return None
 
 
+# Perps on a venue settle on shared funding boundaries, so most rows repeat a
+# handful of next-funding timestamps.
+@lru_cache(maxsize=1024)
 def _iso_from_ms(ts_ms: int) -> str:
     return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).isoformat()
 
@@ -122,12 +133,15 @@ def _minutes_to(now_ms: int, future_ms: int) -> float:
     return max(0.0, (future_ms - now_ms) / 60_000)
 
 
-def fetch_binance_spot() -> dict[str, dict[str, float]]:
-    payload = _http_get_json(BINANCE_SPOT_URL)
+def fetch_binance_spot(symbols: frozenset[str], cache_ttl_sec: float) -> dict[str, dict[str, float]]:
+    payload = http_get_json_cached(BINANCE_SPOT_URL, cache_ttl_sec)
     out: dict[str, dict[str, float]] = {}
 
     for row in payload:
         symbol = row.get("symbol")
+        # Only the requested symbols are used; skip the rest before any field parsing.
+        if symbol not in symbols:
+            continue
         bid = _safe_float(row.get("bidPrice"))
         ask = _safe_float(row.get("askPrice"))
         if not symbol or bid is None or ask is None or ask <= bid:
@@ -137,13 +151,15 @@ def fetch_binance_spot() -> dict[str, dict[str, float]]:
     return out
 
 
-def fetch_bybit_spot() -> dict[str, dict[str, float]]:
-    payload = _http_get_json(BYBIT_SPOT_URL)
+def fetch_bybit_spot(symbols: frozenset[str], cache_ttl_sec: float) -> dict[str, dict[str, float]]:
+    payload = http_get_json_cached(BYBIT_SPOT_URL, cache_ttl_sec)
     rows = payload.get("result", {}).get("list", [])
     out: dict[str, dict[str, float]] = {}
 
     for row in rows:
         symbol = row.get("symbol")
+        if symbol not in symbols:
+            continue
         bid = _safe_float(row.get("bid1Price"))
         ask = _safe_float(row.get("ask1Price"))
         if not symbol or bid is None or ask is None or ask <= bid:
@@ -153,13 +169,13 @@ def fetch_bybit_spot() -> dict[str, dict[str, float]]:
     return out
 
 
-def fetch_binance_perp() -> dict[str, dict[str, float | int]]:
-    payload = _http_get_json(BINANCE_PERP_URL)
+def fetch_binance_perp(symbols: frozenset[str], cache_ttl_sec: float) -> dict[str, dict[str, float | int]]:
+    payload = http_get_json_cached(BINANCE_PERP_URL, cache_ttl_sec)
     out: dict[str, dict[str, float | int]] = {}
 
     for row in payload:
         symbol = row.get("symbol")
-        if not symbol:
+        if symbol not in symbols:
             continue
 
         mark = _safe_float(row.get("markPrice"))
@@ -180,14 +196,14 @@ def fetch_binance_perp() -> dict[str, dict[str, float | int]]:
     return out
 
 
-def fetch_bybit_perp() -> dict[str, dict[str, float | int]]:
-    payload = _http_get_json(BYBIT_PERP_URL)
+def fetch_bybit_perp(symbols: frozenset[str], cache_ttl_sec: float) -> dict[str, dict[str, float | int]]:
+    payload = http_get_json_cached(BYBIT_PERP_URL, cache_ttl_sec)
     rows = payload.get("result", {}).get("list", [])
     out: dict[str, dict[str, float | int]] = {}
 
     for row in rows:
         symbol = row.get("symbol")
-        if not symbol:
+        if symbol not in symbols:
             continue
 
         bid = _safe_float(row.get("bid1Price"))
@@ -242,17 +258,20 @@ def normalize_basis(
         },
     }
 
+    # Parse each requested symbol once for both venues.
+    parsed_symbols = {symbol: parsed for symbol in symbols if (parsed := _parse_symbol(symbol))}
+
     for venue, source in venue_sources.items():
+        spot_rows = source["spot"]
+        perp_rows = source["perp"]
+        # Hash join on symbol; walking symbols keeps the requested row order.
+        joined = parsed_symbols.keys() & spot_rows.keys() & perp_rows.keys()
         for symbol in symbols:
-            spot = source["spot"].get(symbol)
-            perp = source["perp"].get(symbol)
-            if not spot or not perp:
-                continue
-
-            parsed = _parse_symbol(symbol)
-            if not parsed:
+            if symbol not in joined:
                 continue
-            base, quote = parsed
+            base, quote = parsed_symbols[symbol]
+            spot = spot_rows[symbol]
+            perp = perp_rows[symbol]
 
             spot_bid = float(spot["bid"])
             spot_ask = float(spot["ask"])
@@ -277,6 +296,8 @@ def normalize_basis(
             basis_mark_bps = ((perp_mark - spot_mid) / spot_mid) * 10_000
             basis_index_bps = ((perp_index - spot_mid) / spot_mid) * 10_000
 
+            # Venue prices/rates are parsed from decimal strings and written as-is;
+            # only the derived mid and bps figures are rounded for display.
             normalized.append(
                 BasisQuote(
                     detected_at=run_at,
@@ -284,14 +305,14 @@ def normalize_basis(
                     symbol=f"{base}/{quote}",
                     base=base,
                     quote=quote,
-                    spot_bid_price=round(spot_bid, 10),
-                    spot_ask_price=round(spot_ask, 10),
+                    spot_bid_price=spot_bid,
+                    spot_ask_price=spot_ask,
                     spot_mid_price=round(spot_mid, 10),
-                    perp_bid_price=round(perp_bid, 10),
-                    perp_ask_price=round(perp_ask, 10),
-                    perp_mark_price=round(perp_mark, 10),
-                    perp_index_price=round(perp_index, 10),
-                    funding_rate=round(funding_rate, 10),
+                    perp_bid_price=perp_bid,
+                    perp_ask_price=perp_ask,
+                    perp_mark_price=perp_mark,
+                    perp_index_price=perp_index,
+                    funding_rate=funding_rate,
                     funding_rate_bps=round(funding_rate_bps, 6),
                     basis_mark_to_spot_bps=round(basis_mark_bps, 6),
                     basis_index_to_spot_bps=round(basis_index_bps, 6),
@@ -333,15 +354,8 @@ def _build_candidate(
     if gross_edge_bps < min_gross_edge_bps:
         return None
 
-    spot_fee = SPOT_TAKER_FEE_BPS[row.venue]
-    perp_fee = PERP_TAKER_FEE_BPS[row.venue]
-
-    # Entry + exit on both legs.
-    fees_bps = 2 * (spot_fee + perp_fee)
-
-    spot_slip = SPOT_SLIPPAGE_PER_SIDE_BPS[row.venue]
-    perp_slip = PERP_SLIPPAGE_PER_SIDE_BPS[row.venue]
-    slippage_bps = 2 * (spot_slip + perp_slip)
+    fees_bps = ROUNDTRIP_FEES_BPS[row.venue]
+    slippage_bps = ROUNDTRIP_SLIPPAGE_BPS[row.venue]
 
     if inventory_mode == "prepositioned":
         transfer_delay_min = 0.25
@@ -396,7 +410,18 @@ def build_candidates(
     return sorted(out, key=lambda x: x["gross_edge_bps"], reverse=True)
 
 
-def parse_args() -> argparse.Namespace:
+def _dumps_rows(rows: list[dict]) -> str:
+    """Serialize a list of flat records as a JSON array with one compact record per line.
+
+    Still plain JSON for every reader, but each record goes through the C encoder
+    (no indent) and git diffs stay one line per row.
+    """
+    if not rows:
+        return "[]"
+    return "[\n" + ",\n".join(json.dumps(row, separators=(",", ":")) for row in rows) + "\n]\n"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build live perp-spot basis candidates (Binance + Bybit).")
     p.add_argument("--symbols", nargs="*", default=DEFAULT_SYMBOLS)
     p.add_argument("--size-usd", type=float, default=10_000)
@@ -413,22 +438,37 @@ def parse_args() -> argparse.Namespace:
         default="prepositioned",
         help="Transfer delay assumption for spot/perp inventory.",
     )
+    p.add_argument(
+        "--http-cache-ttl-sec",
+        type=float,
+        default=DEFAULT_HTTP_CACHE_TTL_SEC,
+        help="Reuse ticker snapshots younger than this (0 disables the cache)",
+    )
     p.add_argument("--basis-out", type=Path, default=DEFAULT_BASIS_OUT)
     p.add_argument("--candidates-out", type=Path, default=DEFAULT_CANDIDATES_OUT)
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
-def main() -> None:
-    args = parse_args()
-    run_at = datetime.now(tz=timezone.utc).isoformat()
-    now_ms = int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    # One clock read, so run_at and the funding countdowns share the same instant.
+    now = datetime.now(tz=timezone.utc)
+    run_at = now.isoformat()
+    now_ms = int(now.timestamp() * 1000)
 
     symbols = sorted(set(args.symbols))
-
-    binance_spot = fetch_binance_spot()
-    bybit_spot = fetch_bybit_spot()
-    binance_perp = fetch_binance_perp()
-    bybit_perp = fetch_bybit_perp()
+    wanted = frozenset(symbols)
+
+    # The four snapshots are independent network waits; fetch them side by side.
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        f_binance_spot = pool.submit(fetch_binance_spot, wanted, args.http_cache_ttl_sec)
+        f_bybit_spot = pool.submit(fetch_bybit_spot, wanted, args.http_cache_ttl_sec)
+        f_binance_perp = pool.submit(fetch_binance_perp, wanted, args.http_cache_ttl_sec)
+        f_bybit_perp = pool.submit(fetch_bybit_perp, wanted, args.http_cache_ttl_sec)
+    binance_spot = f_binance_spot.result()
+    bybit_spot = f_bybit_spot.result()
+    binance_perp = f_binance_perp.result()
+    bybit_perp = f_bybit_perp.result()
 
     normalized_basis = normalize_basis(
         run_at=run_at,
@@ -452,8 +492,18 @@ def main() -> None:
     args.basis_out.parent.mkdir(parents=True, exist_ok=True)
     args.candidates_out.parent.mkdir(parents=True, exist_ok=True)
 
-    args.basis_out.write_text(json.dumps([asdict(row) for row in normalized_basis], indent=2))
-    args.candidates_out.write_text(json.dumps(candidates, indent=2))
+    # Rows hold only flat scalars; read the fields directly rather than paying for
+    # asdict()'s recursive deep copy of each one.
+    basis_fields = attrgetter(*_BASIS_QUOTE_FIELDS)
+    outputs = [
+        (
+            args.basis_out,
+            _dumps_rows([dict(zip(_BASIS_QUOTE_FIELDS, basis_fields(row))) for row in normalized_basis]),
+        ),
+        (args.candidates_out, _dumps_rows(candidates)),
+    ]
+    for path, text in outputs:
+        atomic_write_bytes(path, text.encode("utf-8"))
 
     print(f"Basis rows normalized: {len(normalized_basis)}")
     print(f"Candidates built: {len(candidates)}")
@@ -17,11 +17,17 @@ from __future__ import annotations
 
 import argparse
 import json
-import urllib.request
-from dataclasses import dataclass, asdict
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
 from datetime import datetime, timezone
+from itertools import repeat
+from operator import attrgetter, ge, itemgetter, le
 from pathlib import Path
 
+from _fileio import atomic_write_bytes
+from _http import DEFAULT_HTTP_CACHE_TTL_SEC, POOL_MAXSIZE_PER_HOST, http_get_json_cached
+
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_QUOTES_OUT = ROOT / "data" / "normalized_quotes_cex_latest.json"
 DEFAULT_DEPTH_OUT = ROOT / "data" / "cex_depth_slippage_latest.json"
@@ -51,8 +57,11 @@ TAKER_FEE_BPS = {
     "bybit": 10.0,
 }
 
+# Buy-leg + sell-leg taker fee per (buy_venue, sell_venue); constant for a run.
+PAIR_TAKER_FEES_BPS = {(b, s): TAKER_FEE_BPS[b] + TAKER_FEE_BPS[s] for b in TAKER_FEE_BPS for s in TAKER_FEE_BPS}
+
 
-@dataclass
+@dataclass(slots=True)
 class Quote:
     detected_at: str
     venue: str
@@ -66,16 +75,21 @@ class Quote:
     spread_bps: float
 
 
-def _http_get_json(url: str, timeout: int = 12) -> dict | list:
-    req = urllib.request.Request(url, headers={"User-Agent": "master-trading-intel/0.1"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+_QUOTE_FIELDS = tuple(f.name for f in fields(Quote))
+
+
+# (bids best-first, asks best-first) as (price, qty) levels.
+BookSides = tuple[list[tuple[float, float]], list[tuple[float, float]]]
+
+
+# Supported quote assets; all four characters long, so one slice finds the suffix.
+QUOTE_SUFFIXES = frozenset({"USDT", "USDC"})
 
 
 def _parse_symbol(symbol: str) -> tuple[str, str] | None:
-    for q in ("USDT", "USDC"):
-        if symbol.endswith(q) and len(symbol) > len(q):
-            return symbol[: -len(q)], q
+    q = symbol[-4:]
+    if q in QUOTE_SUFFIXES and len(symbol) > 4:
+        return symbol[:-4], q
     return None
 
 
@@ -89,11 +103,14 @@ def _safe_float(value: str | float | int) -> float | None:
     return v
 
 
-def fetch_binance_quotes() -> dict[str, dict[str, float]]:
-    payload = _http_get_json(BINANCE_URL)
+def fetch_binance_quotes(symbols: frozenset[str], cache_ttl_sec: float) -> dict[str, dict[str, float]]:
+    payload = http_get_json_cached(BINANCE_URL, cache_ttl_sec)
     out: dict[str, dict[str, float]] = {}
     for row in payload:
         symbol = row.get("symbol")
+        # Only the requested symbols are used; skip the rest before any field parsing.
+        if symbol not in symbols:
+            continue
         bid = _safe_float(row.get("bidPrice"))
         ask = _safe_float(row.get("askPrice"))
         if not symbol or bid is None or ask is None or ask <= bid:
@@ -102,12 +119,14 @@ def fetch_binance_quotes() -> dict[str, dict[str, float]]:
     return out
 
 
-def fetch_bybit_quotes() -> dict[str, dict[str, float]]:
-    payload = _http_get_json(BYBIT_URL)
+def fetch_bybit_quotes(symbols: frozenset[str], cache_ttl_sec: float) -> dict[str, dict[str, float]]:
+    payload = http_get_json_cached(BYBIT_URL, cache_ttl_sec)
     rows = payload.get("result", {}).get("list", [])
     out: dict[str, dict[str, float]] = {}
     for row in rows:
         symbol = row.get("symbol")
+        if symbol not in symbols:
+            continue
         bid = _safe_float(row.get("bid1Price"))
         ask = _safe_float(row.get("ask1Price"))
         if not symbol or bid is None or ask is None or ask <= bid:
@@ -116,106 +135,139 @@ def fetch_bybit_quotes() -> dict[str, dict[str, float]]:
     return out
 
 
-def fetch_binance_orderbook(symbol: str) -> tuple[list[tuple[float, float]], list[tuple[float, float]]]:
-    payload = _http_get_json(BINANCE_DEPTH_URL.format(symbol=symbol))
-    bids: list[tuple[float, float]] = []
-    asks: list[tuple[float, float]] = []
-
-    for row in payload.get("bids", []):
-        if len(row) < 2:
-            continue
-        price = _safe_float(row[0])
-        qty = _safe_float(row[1])
-        if price is None or qty is None:
-            continue
-        bids.append((price, qty))
+def _parse_levels(rows: list) -> list[tuple[float, float]]:
+    """Book levels as (price, qty) floats, dropping malformed or non-positive rows."""
+    # Venues send well-formed [price, qty, ...] string pairs; convert them in one
+    # comprehension and only fall back to per-field checks on a bad row.
+    try:
+        levels = [(float(row[0]), float(row[1])) for row in rows]
+    except (TypeError, ValueError, IndexError, KeyError):
+        levels = []
+        for row in rows:
+            if len(row) < 2:
+                continue
+            price = _safe_float(row[0])
+            qty = _safe_float(row[1])
+            if price is None or qty is None:
+                continue
+            levels.append((price, qty))
+        return levels
+    return [(price, qty) for price, qty in levels if not (price <= 0 or qty <= 0)]
 
-    for row in payload.get("asks", []):
-        if len(row) < 2:
-            continue
-        price = _safe_float(row[0])
-        qty = _safe_float(row[1])
-        if price is None or qty is None:
-            continue
-        asks.append((price, qty))
 
-    bids.sort(key=lambda x: x[0], reverse=True)
-    asks.sort(key=lambda x: x[0])
-    return bids, asks
+def _best_first(levels: list[tuple[float, float]], descending: bool) -> list[tuple[float, float]]:
+    # Both venues already return books best price first; confirm that with one
+    # linear scan and only pay for a sort if a venue ever changes it.
+    prices = [price for price, _ in levels]
+    in_order = all(map(ge if descending else le, prices, prices[1:]))
+    if not in_order:
+        levels.sort(key=itemgetter(0), reverse=descending)
+    return levels
 
 
-def fetch_bybit_orderbook(symbol: str) -> tuple[list[tuple[float, float]], list[tuple[float, float]]]:
-    payload = _http_get_json(BYBIT_DEPTH_URL.format(symbol=symbol))
-    result = payload.get("result", {})
+def fetch_binance_orderbook(symbol: str, cache_ttl_sec: float) -> BookSides:
+    payload = http_get_json_cached(BINANCE_DEPTH_URL.format(symbol=symbol), cache_ttl_sec)
+    bids = _parse_levels(payload.get("bids", []))
+    asks = _parse_levels(payload.get("asks", []))
+    return _best_first(bids, descending=True), _best_first(asks, descending=False)
 
-    bids: list[tuple[float, float]] = []
-    asks: list[tuple[float, float]] = []
 
-    for row in result.get("b", []):
-        if len(row) < 2:
-            continue
-        price = _safe_float(row[0])
-        qty = _safe_float(row[1])
-        if price is None or qty is None:
-            continue
-        bids.append((price, qty))
+def fetch_bybit_orderbook(symbol: str, cache_ttl_sec: float) -> BookSides:
+    payload = http_get_json_cached(BYBIT_DEPTH_URL.format(symbol=symbol), cache_ttl_sec)
+    result = payload.get("result", {})
+    bids = _parse_levels(result.get("b", []))
+    asks = _parse_levels(result.get("a", []))
+    return _best_first(bids, descending=True), _best_first(asks, descending=False)
 
-    for row in result.get("a", []):
-        if len(row) < 2:
-            continue
-        price = _safe_float(row[0])
-        qty = _safe_float(row[1])
-        if price is None or qty is None:
-            continue
-        asks.append((price, qty))
 
-    bids.sort(key=lambda x: x[0], reverse=True)
-    asks.sort(key=lambda x: x[0])
-    return bids, asks
+def _fetch_orderbook_or_none(job: tuple[str, str], cache_ttl_sec: float) -> BookSides | None:
+    symbol, venue = job
+    try:
+        if venue == "binance":
+            return fetch_binance_orderbook(symbol, cache_ttl_sec)
+        return fetch_bybit_orderbook(symbol, cache_ttl_sec)
+    except Exception:
+        return None
 
 
-def _calc_buy_slippage_bps(mid_price: float, asks: list[tuple[float, float]], size_usd: float) -> float | None:
-    target_quote = size_usd
+def _buy_slippage_curve(
+    mid_price: float, asks: list[tuple[float, float]], sizes_usd: list[float]
+) -> list[float | None]:
+    """Buy-side slippage bps for each size, walking the asks once for all tiers."""
+    # Running totals after each whole level; a tier takes every level before the
+    # first one that reaches its size, then the part of that level it needs.
+    # The sums stop at the level that covers the largest tier; deeper levels are
+    # never read.
+    max_quote = max(sizes_usd, default=0.0)
+    cum_quote: list[float] = []
+    cum_base: list[float] = []
     spent_quote = 0.0
     bought_base = 0.0
-
     for price, qty in asks:
         level_quote = price * qty
-        take_quote = min(target_quote - spent_quote, level_quote)
-        if take_quote <= 0:
-            break
-        take_base = take_quote / price
-        spent_quote += take_quote
-        bought_base += take_base
-        if spent_quote >= target_quote:
+        spent_quote += level_quote
+        bought_base += level_quote / price
+        cum_quote.append(spent_quote)
+        cum_base.append(bought_base)
+        if spent_quote >= max_quote:
             break
 
-    if spent_quote < target_quote or bought_base <= 0:
-        return None
-
-    avg_exec = spent_quote / bought_base
-    return max(0.0, (avg_exec / mid_price - 1.0) * 10_000)
+    out: list[float | None] = []
+    for target_quote in sizes_usd:
+        idx = bisect_left(cum_quote, target_quote)
+        if idx == len(cum_quote):
+            out.append(None)
+            continue
+        spent_quote = cum_quote[idx - 1] if idx else 0.0
+        bought_base = cum_base[idx - 1] if idx else 0.0
+        price, qty = asks[idx]
+        take_quote = min(target_quote - spent_quote, price * qty)
+        spent_quote += take_quote
+        bought_base += take_quote / price
+        if bought_base <= 0:
+            out.append(None)
+            continue
+        avg_exec = spent_quote / bought_base
+        out.append(max(0.0, (avg_exec / mid_price - 1.0) * 10_000))
+    return out
 
 
-def _calc_sell_slippage_bps(mid_price: float, bids: list[tuple[float, float]], size_usd: float) -> float | None:
-    target_base = size_usd / mid_price
+def _sell_slippage_curve(
+    mid_price: float, bids: list[tuple[float, float]], sizes_usd: list[float]
+) -> list[float | None]:
+    """Sell-side slippage bps for each size, walking the bids once for all tiers."""
+    max_base = max(sizes_usd, default=0.0) / mid_price
+    cum_base: list[float] = []
+    cum_quote: list[float] = []
     sold_base = 0.0
     received_quote = 0.0
-
     for price, qty in bids:
-        take_base = min(target_base - sold_base, qty)
-        if take_base <= 0:
+        received_quote += qty * price
+        sold_base += qty
+        cum_base.append(sold_base)
+        cum_quote.append(received_quote)
+        if sold_base >= max_base:
             break
+
+    out: list[float | None] = []
+    for size_usd in sizes_usd:
+        target_base = size_usd / mid_price
+        idx = bisect_left(cum_base, target_base)
+        if idx == len(cum_base):
+            out.append(None)
+            continue
+        sold_base = cum_base[idx - 1] if idx else 0.0
+        received_quote = cum_quote[idx - 1] if idx else 0.0
+        price, qty = bids[idx]
+        take_base = min(target_base - sold_base, qty)
         received_quote += take_base * price
         sold_base += take_base
-        if sold_base >= target_base:
-            break
-
-    if sold_base < target_base or sold_base <= 0:
-        return None
-
-    avg_exec = received_quote / sold_base
-    return max(0.0, (1.0 - avg_exec / mid_price) * 10_000)
+        if sold_base <= 0:
+            out.append(None)
+            continue
+        avg_exec = received_quote / sold_base
+        out.append(max(0.0, (1.0 - avg_exec / mid_price) * 10_000))
+    return out
 
 
 def normalize_quotes(
@@ -226,20 +278,22 @@ def normalize_quotes(
 ) -> list[Quote]:
     normalized: list[Quote] = []
 
+    # Parse each requested symbol once for both venues.
+    parsed_symbols = {symbol: parsed for symbol in symbols if (parsed := _parse_symbol(symbol))}
+
     for venue, source in (("binance", binance), ("bybit", bybit)):
+        joined = parsed_symbols.keys() & source.keys()
         for symbol in symbols:
-            row = source.get(symbol)
-            if not row:
+            if symbol not in joined:
                 continue
-            parsed = _parse_symbol(symbol)
-            if not parsed:
-                continue
-            base, quote_ccy = parsed
+            base, quote_ccy = parsed_symbols[symbol]
+            row = source[symbol]
             bid = row["bid"]
             ask = row["ask"]
             mid = (bid + ask) / 2
             spread_bps = ((ask - bid) / mid) * 10_000
 
+            # bid/ask are parsed venue decimals and written as-is; only derived fields round.
             normalized.append(
                 Quote(
                     detected_at=run_at,
@@ -248,8 +302,8 @@ def normalize_quotes(
                     symbol=f"{base}/{quote_ccy}",
                     base=base,
                     quote=quote_ccy,
-                    bid_price=round(bid, 10),
-                    ask_price=round(ask, 10),
+                    bid_price=bid,
+                    ask_price=ask,
                     mid_price=round(mid, 10),
                     spread_bps=round(spread_bps, 6),
                 )
@@ -262,12 +316,26 @@ def build_depth_slippage(
     symbols: list[str],
     normalized_quotes: list[Quote],
     size_tiers_usd: list[float],
+    cache_ttl_sec: float,
 ) -> dict[str, dict[str, dict]]:
     mid_lookup: dict[str, dict[str, float]] = {}
     for q in normalized_quotes:
         sym = q.base + q.quote
         mid_lookup.setdefault(sym, {})[q.venue] = q.mid_price
 
+    # Each book is its own round trip; fetch them all concurrently over the
+    # per-host keep-alive pool, then model tiers in symbol/venue order.
+    jobs = [
+        (symbol, venue)
+        for symbol in symbols
+        for venue in ("binance", "bybit")
+        if mid_lookup.get(symbol, {}).get(venue) is not None
+    ]
+    books: dict[tuple[str, str], BookSides | None] = {}
+    if jobs:
+        with ThreadPoolExecutor(max_workers=min(len(jobs), 2 * POOL_MAXSIZE_PER_HOST)) as pool:
+            books = dict(zip(jobs, pool.map(_fetch_orderbook_or_none, jobs, repeat(cache_ttl_sec))))
+
     out: dict[str, dict[str, dict]] = {}
 
     for symbol in symbols:
@@ -277,35 +345,27 @@ def build_depth_slippage(
             if mid is None:
                 continue
 
-            try:
-                if venue == "binance":
-                    bids, asks = fetch_binance_orderbook(symbol)
-                else:
-                    bids, asks = fetch_bybit_orderbook(symbol)
-            except Exception:
+            book = books.get((symbol, venue))
+            if book is None:
                 continue
+            bids, asks = book
 
             tier_rows: list[dict] = []
             tier_lookup: dict[str, dict[str, float]] = {}
-            for size in size_tiers_usd:
-                buy_slip = _calc_buy_slippage_bps(mid, asks, size)
-                sell_slip = _calc_sell_slippage_bps(mid, bids, size)
-
-                tier_rows.append(
-                    {
-                        "size_usd": round(size, 2),
-                        "buy_slippage_bps": round(buy_slip, 6) if buy_slip is not None else None,
-                        "sell_slippage_bps": round(sell_slip, 6) if sell_slip is not None else None,
-                    }
-                )
-
-                tier_lookup[f"{int(size)}"] = {
+            buy_curve = _buy_slippage_curve(mid, asks, size_tiers_usd)
+            sell_curve = _sell_slippage_curve(mid, bids, size_tiers_usd)
+            for size, buy_slip, sell_slip in zip(size_tiers_usd, buy_curve, sell_curve):
+                # Round each value once; the tier row and the lookup carry the same numbers.
+                slips = {
                     "buy_slippage_bps": round(buy_slip, 6) if buy_slip is not None else None,
                     "sell_slippage_bps": round(sell_slip, 6) if sell_slip is not None else None,
                 }
+                tier_rows.append({"size_usd": round(size, 2), **slips})
+                tier_lookup[f"{int(size)}"] = slips
 
+            # mid comes from Quote.mid_price, which normalize_quotes already rounded.
             out[symbol][venue] = {
-                "mid_price": round(mid, 10),
+                "mid_price": mid,
                 "book_levels": {"bids": len(bids), "asks": len(asks)},
                 "slippage_bps_by_tier": tier_rows,
                 "slippage_lookup": tier_lookup,
@@ -314,22 +374,27 @@ def build_depth_slippage(
     return out
 
 
+def _nearest_tiers(depth_slippage: dict[str, dict[str, dict]], size_usd: float) -> dict[tuple[str, str], dict]:
+    """Flat (symbol, venue) -> tier row closest to size_usd, picked once per book."""
+    nearest: dict[tuple[str, str], dict] = {}
+    for symbol, venues in depth_slippage.items():
+        for venue, venue_payload in venues.items():
+            tiers = venue_payload.get("slippage_bps_by_tier", []) if venue_payload else []
+            if tiers:
+                nearest[(symbol, venue)] = min(tiers, key=lambda row: abs(float(row["size_usd"]) - size_usd))
+    return nearest
+
+
 def _resolve_depth_slippage(
-    depth_slippage: dict[str, dict[str, dict]],
+    nearest_tiers: dict[tuple[str, str], dict],
     symbol: str,
     venue: str,
-    size_usd: float,
     side: str,
 ) -> tuple[float | None, str | None]:
-    venue_payload = depth_slippage.get(symbol, {}).get(venue)
-    if not venue_payload:
-        return None, None
-
-    tiers = venue_payload.get("slippage_bps_by_tier", [])
-    if not tiers:
+    best = nearest_tiers.get((symbol, venue))
+    if best is None:
         return None, None
 
-    best = min(tiers, key=lambda row: abs(float(row["size_usd"]) - size_usd))
     key = "buy_slippage_bps" if side == "buy" else "sell_slippage_bps"
     value = best.get(key)
     if value is None:
@@ -346,19 +411,15 @@ def _build_candidate(
     sell_bid: float,
     buy_spread_bps: float,
     sell_spread_bps: float,
+    gross_edge_bps: float,
     size_usd: float,
     transfer_delay_min: float,
-    min_gross_edge_bps: float,
-    depth_slippage: dict[str, dict[str, dict]],
-) -> dict | None:
-    gross_edge_bps = ((sell_bid - buy_ask) / buy_ask) * 10_000
-    if gross_edge_bps < min_gross_edge_bps:
-        return None
-
-    fees_bps = TAKER_FEE_BPS[buy_venue] + TAKER_FEE_BPS[sell_venue]
+    nearest_tiers: dict[tuple[str, str], dict],
+) -> dict:
+    fees_bps = PAIR_TAKER_FEES_BPS[(buy_venue, sell_venue)]
 
-    buy_depth_slip, buy_tier = _resolve_depth_slippage(depth_slippage, symbol, buy_venue, size_usd, "buy")
-    sell_depth_slip, sell_tier = _resolve_depth_slippage(depth_slippage, symbol, sell_venue, size_usd, "sell")
+    buy_depth_slip, buy_tier = _resolve_depth_slippage(nearest_tiers, symbol, buy_venue, "buy")
+    sell_depth_slip, sell_tier = _resolve_depth_slippage(nearest_tiers, symbol, sell_venue, "sell")
 
     if buy_depth_slip is not None and sell_depth_slip is not None:
         slippage_bps = buy_depth_slip + sell_depth_slip + 0.80
@@ -401,57 +462,64 @@ def build_candidates(
     min_gross_edge_bps: float,
     depth_slippage: dict[str, dict[str, dict]],
 ) -> list[dict]:
-    by_symbol_venue: dict[str, dict[str, Quote]] = {}
+    by_venue: dict[str, dict[str, Quote]] = {"binance": {}, "bybit": {}}
     for q in normalized_quotes:
-        symbol_raw = q.base + q.quote
-        by_symbol_venue.setdefault(symbol_raw, {})[q.venue] = q
-
-    candidates: list[dict] = []
+        venue_quotes = by_venue.get(q.venue)
+        if venue_quotes is not None:
+            venue_quotes[q.base + q.quote] = q
+    binance_quotes = by_venue["binance"]
+    bybit_quotes = by_venue["bybit"]
+    # Symbols quoted on both venues, joined once instead of per-symbol lookups.
+    both_venues = binance_quotes.keys() & bybit_quotes.keys()
+
+    # Price both directions for every symbol first and gate on edge, so the depth
+    # lookups, f-string notes and dict build only run for surviving legs.
+    legs: list[tuple[str, str, str, Quote, Quote, float]] = []
     for symbol in symbols:
-        venue_quotes = by_symbol_venue.get(symbol, {})
-        bq = venue_quotes.get("binance")
-        yq = venue_quotes.get("bybit")
-        if not bq or not yq:
+        if symbol not in both_venues:
             continue
-
-        c1 = _build_candidate(
+        bq = binance_quotes[symbol]
+        yq = bybit_quotes[symbol]
+        for buy_venue, sell_venue, buy_q, sell_q in (("binance", "bybit", bq, yq), ("bybit", "binance", yq, bq)):
+            gross_edge_bps = ((sell_q.bid_price - buy_q.ask_price) / buy_q.ask_price) * 10_000
+            if gross_edge_bps >= min_gross_edge_bps:
+                legs.append((symbol, buy_venue, sell_venue, buy_q, sell_q, gross_edge_bps))
+
+    # size_usd is fixed for the run, so each book's nearest tier is chosen once.
+    nearest_tiers = _nearest_tiers(depth_slippage, size_usd)
+    candidates = [
+        _build_candidate(
             run_at=run_at,
             symbol=symbol,
-            buy_venue="binance",
-            sell_venue="bybit",
-            buy_ask=bq.ask_price,
-            sell_bid=yq.bid_price,
-            buy_spread_bps=bq.spread_bps,
-            sell_spread_bps=yq.spread_bps,
+            buy_venue=buy_venue,
+            sell_venue=sell_venue,
+            buy_ask=buy_q.ask_price,
+            sell_bid=sell_q.bid_price,
+            buy_spread_bps=buy_q.spread_bps,
+            sell_spread_bps=sell_q.spread_bps,
+            gross_edge_bps=gross_edge_bps,
             size_usd=size_usd,
             transfer_delay_min=transfer_delay_min,
-            min_gross_edge_bps=min_gross_edge_bps,
-            depth_slippage=depth_slippage,
+            nearest_tiers=nearest_tiers,
         )
-        if c1:
-            candidates.append(c1)
+        for symbol, buy_venue, sell_venue, buy_q, sell_q, gross_edge_bps in legs
+    ]
 
-        c2 = _build_candidate(
-            run_at=run_at,
-            symbol=symbol,
-            buy_venue="bybit",
-            sell_venue="binance",
-            buy_ask=yq.ask_price,
-            sell_bid=bq.bid_price,
-            buy_spread_bps=yq.spread_bps,
-            sell_spread_bps=bq.spread_bps,
-            size_usd=size_usd,
-            transfer_delay_min=transfer_delay_min,
-            min_gross_edge_bps=min_gross_edge_bps,
-            depth_slippage=depth_slippage,
-        )
-        if c2:
-            candidates.append(c2)
+    return sorted(candidates, key=itemgetter("gross_edge_bps"), reverse=True)
+
+
+def _dumps_rows(rows: list[dict]) -> str:
+    """Serialize a list of flat records as a JSON array with one compact record per line.
 
-    return sorted(candidates, key=lambda x: x["gross_edge_bps"], reverse=True)
+    Still plain JSON for every reader, but each record goes through the C encoder
+    (no indent) and git diffs stay one line per row.
+    """
+    if not rows:
+        return "[]"
+    return "[\n" + ",\n".join(json.dumps(row, separators=(",", ":")) for row in rows) + "\n]\n"
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build live CEX-CEX opportunity candidates.")
     p.add_argument("--symbols", nargs="*", default=DEFAULT_SYMBOLS, help="Symbols like BTCUSDT ETHUSDT")
     p.add_argument("--size-usd", type=float, default=10_000, help="Assumed scan size in USD")
@@ -464,20 +532,31 @@ def parse_args() -> argparse.Namespace:
     )
     p.add_argument("--transfer-delay-min", type=float, default=5.0, help="Estimated transfer delay minutes")
     p.add_argument("--min-gross-edge-bps", type=float, default=0.2, help="Drop directions below this gross edge")
+    p.add_argument(
+        "--http-cache-ttl-sec",
+        type=float,
+        default=DEFAULT_HTTP_CACHE_TTL_SEC,
+        help="Reuse ticker and depth snapshots younger than this (0 disables the cache)",
+    )
     p.add_argument("--quotes-out", type=Path, default=DEFAULT_QUOTES_OUT)
     p.add_argument("--depth-out", type=Path, default=DEFAULT_DEPTH_OUT)
     p.add_argument("--candidates-out", type=Path, default=DEFAULT_CANDIDATES_OUT)
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     run_at = datetime.now(tz=timezone.utc).isoformat()
 
-    binance = fetch_binance_quotes()
-    bybit = fetch_bybit_quotes()
-
     symbols = sorted(set(args.symbols))
+    wanted = frozenset(symbols)
+
+    # Both venue snapshots are independent network waits; fetch them side by side.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        f_binance = pool.submit(fetch_binance_quotes, wanted, args.http_cache_ttl_sec)
+        f_bybit = pool.submit(fetch_bybit_quotes, wanted, args.http_cache_ttl_sec)
+    binance = f_binance.result()
+    bybit = f_bybit.result()
     normalized_quotes = normalize_quotes(run_at, symbols, binance, bybit)
 
     size_tiers_usd = sorted({float(x) for x in args.size_tiers_usd if x > 0})
@@ -485,6 +564,7 @@ def main() -> None:
         symbols=symbols,
         normalized_quotes=normalized_quotes,
         size_tiers_usd=size_tiers_usd,
+        cache_ttl_sec=args.http_cache_ttl_sec,
     )
 
     candidates = build_candidates(
@@ -507,9 +587,16 @@ def main() -> None:
     args.depth_out.parent.mkdir(parents=True, exist_ok=True)
     args.candidates_out.parent.mkdir(parents=True, exist_ok=True)
 
-    args.quotes_out.write_text(json.dumps([asdict(q) for q in normalized_quotes], indent=2))
-    args.depth_out.write_text(json.dumps(depth_payload, indent=2))
-    args.candidates_out.write_text(json.dumps(candidates, indent=2))
+    # Rows hold only flat scalars; read the fields directly rather than paying for
+    # asdict()'s recursive deep copy of each one.
+    quote_fields = attrgetter(*_QUOTE_FIELDS)
+    outputs = [
+        (args.quotes_out, _dumps_rows([dict(zip(_QUOTE_FIELDS, quote_fields(q))) for q in normalized_quotes])),
+        (args.depth_out, json.dumps(depth_payload, indent=2)),
+        (args.candidates_out, _dumps_rows(candidates)),
+    ]
+    for path, text in outputs:
+        atomic_write_bytes(path, text.encode("utf-8"))
 
     venues_covered = sum(len(v) for v in depth_slippage.values())
 
@@ -11,10 +11,13 @@ from __future__ import annotations
 import argparse
 import json
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
+from _fileio import atomic_write_bytes
+from _http import DEFAULT_HTTP_CACHE_TTL_SEC, http_get_json_cached
+
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_DEX_QUOTES_OUT = ROOT / "data" / "normalized_quotes_dex_latest.json"
 DEFAULT_CANDIDATES_OUT = ROOT / "data" / "opportunity_candidates.cex_dex.live.json"
@@ -23,9 +26,12 @@ DEFAULT_NETWORK_FRICTION_PATH = ROOT / "data" / "network_friction.latest.json"
 BINANCE_URL = "https://api.binance.com/api/v3/ticker/bookTicker"
 BYBIT_URL = "https://api.bybit.com/v5/market/tickers?category=spot"
 JUP_QUOTE_URL = "https://lite-api.jup.ag/swap/v1/quote"
+# Jupiter routing can take a while to answer; allow more than the shared default.
+HTTP_TIMEOUT_SEC = 15
 
 USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
 USDC_DECIMALS = 6
+USDC_SCALE = 10**USDC_DECIMALS
 
 TAKER_FEE_BPS = {
     "binance": 7.5,
@@ -47,12 +53,8 @@ TOKENS = [
         "decimals": 6,
     },
 ]
-
-
-def _http_get_json(url: str, timeout: int = 15) -> dict | list:
-    req = urllib.request.Request(url, headers={"User-Agent": "master-trading-intel/0.1"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+# Atomic units per whole token, computed once rather than per quote.
+TOKEN_SCALE = {t["symbol"]: 10**t["decimals"] for t in TOKENS}
 
 
 def _safe_float(value: str | int | float | None) -> float | None:
@@ -103,10 +105,18 @@ def load_jupiter_fee_model(network_friction_path: Path, fallback_router_fee_bps:
     return router_fee_bps, network_fee_bps, source
 
 
-def fetch_cex_quotes(symbols: set[str]) -> dict[str, dict[str, dict[str, float]]]:
+def fetch_cex_quotes(symbols: frozenset[str], cache_ttl_sec: float) -> dict[str, dict[str, dict[str, float]]]:
     out: dict[str, dict[str, dict[str, float]]] = {"binance": {}, "bybit": {}}
+    # Full venue snapshots, filtered locally: the same URLs as the CEX and basis
+    # builders, so a web build serves them from the shared cache, and a renamed or
+    # delisted TOKENS symbol just drops its row instead of failing the request. The
+    # two snapshots are independent network waits; fetch them side by side.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        f_binance = pool.submit(http_get_json_cached, BINANCE_URL, cache_ttl_sec, HTTP_TIMEOUT_SEC)
+        f_bybit = pool.submit(http_get_json_cached, BYBIT_URL, cache_ttl_sec, HTTP_TIMEOUT_SEC)
+    binance_payload = f_binance.result()
+    bybit_payload = f_bybit.result()
 
-    binance_payload = _http_get_json(BINANCE_URL)
     for row in binance_payload:
         symbol = row.get("symbol")
         if symbol not in symbols:
@@ -124,7 +134,6 @@ def fetch_cex_quotes(symbols: set[str]) -> dict[str, dict[str, dict[str, float]]
             "spread_bps": spread_bps,
         }
 
-    bybit_payload = _http_get_json(BYBIT_URL)
     for row in bybit_payload.get("result", {}).get("list", []):
         symbol = row.get("symbol")
         if symbol not in symbols:
@@ -145,7 +154,9 @@ def fetch_cex_quotes(symbols: set[str]) -> dict[str, dict[str, dict[str, float]]
     return out
 
 
-def fetch_jupiter_quote(input_mint: str, output_mint: str, amount_atomic: int, slippage_bps: int) -> dict:
+def fetch_jupiter_quote(
+    input_mint: str, output_mint: str, amount_atomic: int, slippage_bps: int, cache_ttl_sec: float
+) -> dict:
     query = urllib.parse.urlencode(
         {
             "inputMint": input_mint,
@@ -155,30 +166,38 @@ def fetch_jupiter_quote(input_mint: str, output_mint: str, amount_atomic: int, s
             "restrictIntermediateTokens": "true",
         }
     )
-    return _http_get_json(f"{JUP_QUOTE_URL}?{query}")
+    # The query carries mints, amount and slippage, so the URL is the quote cache key.
+    return http_get_json_cached(f"{JUP_QUOTE_URL}?{query}", cache_ttl_sec, HTTP_TIMEOUT_SEC)
 
 
-def build_dex_quote(run_at: str, token: dict, ref_mid: float, size_usd: float, slippage_bps: int) -> dict | None:
-    base_decimals = token["decimals"]
-
+def size_dex_legs(token: dict, ref_mid: float, size_usd: float) -> tuple[float, int, int] | None:
+    """Return (base_amount, base_amount_atomic, usdc_amount_atomic) for the two Jupiter legs."""
     # Size base leg from USD notional anchored by CEX mid.
     base_amount = max(0.0001, size_usd / ref_mid)
-    base_amount_atomic = int(base_amount * (10**base_decimals))
-    usdc_amount_atomic = int(size_usd * (10**USDC_DECIMALS))
+    base_amount_atomic = int(base_amount * TOKEN_SCALE[token["symbol"]])
+    usdc_amount_atomic = int(size_usd * USDC_SCALE)
 
     if base_amount_atomic <= 0 or usdc_amount_atomic <= 0:
         return None
+    return base_amount, base_amount_atomic, usdc_amount_atomic
 
-    sell_quote = fetch_jupiter_quote(token["mint"], USDC_MINT, base_amount_atomic, slippage_bps)
-    buy_quote = fetch_jupiter_quote(USDC_MINT, token["mint"], usdc_amount_atomic, slippage_bps)
 
+def build_dex_quote(
+    run_at: str,
+    token: dict,
+    ref_mid: float,
+    size_usd: float,
+    base_amount: float,
+    sell_quote: dict,
+    buy_quote: dict,
+) -> dict | None:
     out_usdc_atomic = _safe_float(sell_quote.get("outAmount"))
     out_base_atomic = _safe_float(buy_quote.get("outAmount"))
     if out_usdc_atomic is None or out_base_atomic is None:
         return None
 
-    out_usdc = out_usdc_atomic / (10**USDC_DECIMALS)
-    out_base = out_base_atomic / (10**base_decimals)
+    out_usdc = out_usdc_atomic / USDC_SCALE
+    out_base = out_base_atomic / TOKEN_SCALE[token["symbol"]]
     if out_usdc <= 0 or out_base <= 0:
         return None
 
@@ -247,6 +266,10 @@ def build_candidates(
         dex_ask = dex["ask_price"]
         dex_spread = dex["spread_bps"]
         dex_impact = (dex["buy_leg_price_impact_bps"] + dex["sell_leg_price_impact_bps"]) / 2
+        dex_note = (
+            f"dex_spread={dex_spread:.2f}bps dex_impact={dex_impact:.2f}bps "
+            f"dex_router_fee={dex_router_fee_bps:.4f}bps dex_network_fee={dex_network_fee_bps:.6f}bps source={dex_fee_source}"
+        )
 
         for venue, venue_quotes in cex_quotes.items():
             cex = venue_quotes.get(symbol)
@@ -256,11 +279,13 @@ def build_candidates(
             cex_bid = cex["bid"]
             cex_ask = cex["ask"]
             cex_spread = cex["spread_bps"]
+            # Fees and slippage do not depend on direction; work them out once per venue.
+            fees_bps = round(dex_total_fee_bps + TAKER_FEE_BPS[venue], 6)
+            slippage_bps = round(0.55 * cex_spread + 0.65 * dex_spread + 0.5 * dex_impact + 0.8, 6)
 
             # Direction 1: buy on DEX, sell on CEX.
             gross_1 = ((cex_bid - dex_ask) / dex_ask) * 10_000
             if gross_1 >= min_gross_edge_bps:
-                slippage_1 = 0.55 * cex_spread + 0.65 * dex_spread + 0.5 * dex_impact + 0.8
                 latency_1 = 2.4 + max(0.0, 10.0 - gross_1) * 0.08
                 candidates.append(
                     {
@@ -270,23 +295,18 @@ def build_candidates(
                         "buy_venue": "jupiter",
                         "sell_venue": venue,
                         "gross_edge_bps": round(gross_1, 6),
-                        "fees_bps": round(dex_total_fee_bps + TAKER_FEE_BPS[venue], 6),
-                        "slippage_bps": round(slippage_1, 6),
+                        "fees_bps": fees_bps,
+                        "slippage_bps": slippage_bps,
                         "latency_risk_bps": round(latency_1, 6),
                         "transfer_delay_min": round(transfer_delay_min, 4),
                         "size_usd": round(size_usd, 2),
-                        "notes": (
-                            f"buy_dex_sell_cex dex_ask={dex_ask:.8f} cex_bid={cex_bid:.8f} "
-                            f"dex_spread={dex_spread:.2f}bps dex_impact={dex_impact:.2f}bps "
-                            f"dex_router_fee={dex_router_fee_bps:.4f}bps dex_network_fee={dex_network_fee_bps:.6f}bps source={dex_fee_source}"
-                        ),
+                        "notes": f"buy_dex_sell_cex dex_ask={dex_ask:.8f} cex_bid={cex_bid:.8f} {dex_note}",
                     }
                 )
 
             # Direction 2: buy on CEX, sell on DEX.
             gross_2 = ((dex_bid - cex_ask) / cex_ask) * 10_000
             if gross_2 >= min_gross_edge_bps:
-                slippage_2 = 0.55 * cex_spread + 0.65 * dex_spread + 0.5 * dex_impact + 0.8
                 latency_2 = 2.4 + max(0.0, 10.0 - gross_2) * 0.08
                 candidates.append(
                     {
@@ -296,23 +316,30 @@ def build_candidates(
                         "buy_venue": venue,
                         "sell_venue": "jupiter",
                         "gross_edge_bps": round(gross_2, 6),
-                        "fees_bps": round(dex_total_fee_bps + TAKER_FEE_BPS[venue], 6),
-                        "slippage_bps": round(slippage_2, 6),
+                        "fees_bps": fees_bps,
+                        "slippage_bps": slippage_bps,
                         "latency_risk_bps": round(latency_2, 6),
                         "transfer_delay_min": round(transfer_delay_min, 4),
                         "size_usd": round(size_usd, 2),
-                        "notes": (
-                            f"buy_cex_sell_dex cex_ask={cex_ask:.8f} dex_bid={dex_bid:.8f} "
-                            f"dex_spread={dex_spread:.2f}bps dex_impact={dex_impact:.2f}bps "
-                            f"dex_router_fee={dex_router_fee_bps:.4f}bps dex_network_fee={dex_network_fee_bps:.6f}bps source={dex_fee_source}"
-                        ),
+                        "notes": f"buy_cex_sell_dex cex_ask={cex_ask:.8f} dex_bid={dex_bid:.8f} {dex_note}",
                     }
                 )
 
     return sorted(candidates, key=lambda x: x["gross_edge_bps"], reverse=True)
 
 
-def parse_args() -> argparse.Namespace:
+def _dumps_rows(rows: list[dict]) -> str:
+    """Serialize a list of flat records as a JSON array with one compact record per line.
+
+    Still plain JSON for every reader, but each record goes through the C encoder
+    (no indent) and git diffs stay one line per row.
+    """
+    if not rows:
+        return "[]"
+    return "[\n" + ",\n".join(json.dumps(row, separators=(",", ":")) for row in rows) + "\n]\n"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build CEX-DEX live candidates (Binance/Bybit vs Jupiter).")
     p.add_argument("--size-usd", type=float, default=5000.0, help="Notional size for quoting and friction model")
     p.add_argument("--slippage-bps", type=int, default=30, help="Jupiter quote slippage setting")
@@ -336,17 +363,23 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_DEX_ROUTER_FEE_BPS,
         help="Fallback Jupiter router fee bps when no network model exists",
     )
+    p.add_argument(
+        "--http-cache-ttl-sec",
+        type=float,
+        default=DEFAULT_HTTP_CACHE_TTL_SEC,
+        help="Reuse CEX snapshots and Jupiter quotes younger than this (0 disables the cache)",
+    )
     p.add_argument("--dex-quotes-out", type=Path, default=DEFAULT_DEX_QUOTES_OUT)
     p.add_argument("--candidates-out", type=Path, default=DEFAULT_CANDIDATES_OUT)
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     run_at = datetime.now(tz=timezone.utc).isoformat()
 
-    symbols = {token["symbol"] for token in TOKENS}
-    cex_quotes = fetch_cex_quotes(symbols)
+    symbols = frozenset(token["symbol"] for token in TOKENS)
+    cex_quotes = fetch_cex_quotes(symbols, args.http_cache_ttl_sec)
 
     dex_router_fee_bps, dex_network_fee_bps, dex_fee_source = load_jupiter_fee_model(
         args.network_friction,
@@ -356,27 +389,58 @@ def main() -> None:
     dex_quotes: list[dict] = []
     dex_quotes_by_symbol: dict[str, dict] = {}
 
-    for token in TOKENS:
-        symbol = token["symbol"]
-        mids = [
-            venue_quotes[symbol]["mid"]
-            for venue_quotes in cex_quotes.values()
-            if symbol in venue_quotes
-        ]
-        if not mids:
-            continue
+    # Every Jupiter leg is an independent round trip: submit both legs of every
+    # token up front, then finalize the quotes in TOKENS order.
+    with ThreadPoolExecutor(max_workers=2 * len(TOKENS)) as pool:
+        pending = []
+        for token in TOKENS:
+            symbol = token["symbol"]
+            mids = [
+                venue_quotes[symbol]["mid"]
+                for venue_quotes in cex_quotes.values()
+                if symbol in venue_quotes
+            ]
+            if not mids:
+                continue
 
-        ref_mid = sum(mids) / len(mids)
-        try:
-            dex = build_dex_quote(run_at, token, ref_mid, args.size_usd, args.slippage_bps)
-        except Exception:
-            dex = None
+            ref_mid = sum(mids) / len(mids)
+            legs = size_dex_legs(token, ref_mid, args.size_usd)
+            if legs is None:
+                continue
+            base_amount, base_amount_atomic, usdc_amount_atomic = legs
+
+            sell_future = pool.submit(
+                fetch_jupiter_quote,
+                token["mint"],
+                USDC_MINT,
+                base_amount_atomic,
+                args.slippage_bps,
+                args.http_cache_ttl_sec,
+            )
+            buy_future = pool.submit(
+                fetch_jupiter_quote,
+                USDC_MINT,
+                token["mint"],
+                usdc_amount_atomic,
+                args.slippage_bps,
+                args.http_cache_ttl_sec,
+            )
+            pending.append((token, ref_mid, base_amount, sell_future, buy_future))
+
+        for token, ref_mid, base_amount, sell_future, buy_future in pending:
+            # A failed or malformed leg drops only this token's quote.
+            try:
+                dex = build_dex_quote(
+                    run_at, token, ref_mid, args.size_usd, base_amount, sell_future.result(), buy_future.result()
+                )
+            except Exception:
+                dex = None
 
-        if not dex:
-            continue
+            if not dex:
+                continue
 
-        dex_quotes.append(dex)
-        dex_quotes_by_symbol[symbol] = dex
+            dex_quotes.append(dex)
+            dex_quotes_by_symbol[token["symbol"]] = dex
 
     candidates = build_candidates(
         run_at=run_at,
@@ -393,8 +457,12 @@ def main() -> None:
 
     args.dex_quotes_out.parent.mkdir(parents=True, exist_ok=True)
     args.candidates_out.parent.mkdir(parents=True, exist_ok=True)
-    args.dex_quotes_out.write_text(json.dumps(dex_quotes, indent=2))
-    args.candidates_out.write_text(json.dumps(candidates, indent=2))
+    outputs = [
+        (args.dex_quotes_out, _dumps_rows(dex_quotes)),
+        (args.candidates_out, _dumps_rows(candidates)),
+    ]
+    for path, text in outputs:
+        atomic_write_bytes(path, text.encode("utf-8"))
 
     rejected_by_reference = sum(1 for q in dex_quotes if q.get("reference_deviation_bps", 0) > args.max_ref_deviation_bps)
     rejected_by_cross = sum(1 for q in dex_quotes if q.get("crossed_quote"))
@@ -15,11 +15,15 @@ from __future__ import annotations
 
 import argparse
 import json
-import urllib.request
-from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
 from datetime import datetime, timezone
+from operator import attrgetter
 from pathlib import Path
 
+from _fileio import atomic_write_bytes
+from _http import DEFAULT_HTTP_CACHE_TTL_SEC, http_get_json_cached
+
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_FUNDING_OUT = ROOT / "data" / "normalized_funding_latest.json"
 DEFAULT_CANDIDATES_OUT = ROOT / "data" / "opportunity_candidates.funding.live.json"
@@ -53,7 +57,7 @@ PERP_SLIPPAGE_PER_SIDE_BPS = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class FundingQuote:
     detected_at: str
     venue: str
@@ -68,10 +72,7 @@ class FundingQuote:
     minutes_to_funding: float
 
 
-def _http_get_json(url: str, timeout: int = 12) -> dict | list:
-    req = urllib.request.Request(url, headers={"User-Agent": "master-trading-intel/0.1"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+_FUNDING_QUOTE_FIELDS = tuple(f.name for f in fields(FundingQuote))
 
 
 def _safe_float(value: str | float | int) -> float | None:
@@ -105,8 +106,8 @@ def _minutes_to(now_ms: int, future_ms: int) -> float:
     return max(0.0, (future_ms - now_ms) / 60_000)
 
 
-def fetch_binance_funding() -> dict[str, dict[str, float | int]]:
-    payload = _http_get_json(BINANCE_FUNDING_URL)
+def fetch_binance_funding(cache_ttl_sec: float) -> dict[str, dict[str, float | int]]:
+    payload = http_get_json_cached(BINANCE_FUNDING_URL, cache_ttl_sec)
     out: dict[str, dict[str, float | int]] = {}
 
     for row in payload:
@@ -129,8 +130,8 @@ def fetch_binance_funding() -> dict[str, dict[str, float | int]]:
     return out
 
 
-def fetch_bybit_funding() -> dict[str, dict[str, float | int]]:
-    payload = _http_get_json(BYBIT_FUNDING_URL)
+def fetch_bybit_funding(cache_ttl_sec: float) -> dict[str, dict[str, float | int]]:
+    payload = http_get_json_cached(BYBIT_FUNDING_URL, cache_ttl_sec)
     rows = payload.get("result", {}).get("list", [])
     out: dict[str, dict[str, float | int]] = {}
 
@@ -204,6 +205,7 @@ def _build_candidate(
     short_venue: str,
     long_row: dict[str, float | int],
     short_row: dict[str, float | int],
+    now_ms: int,
     size_usd: float,
     min_gross_edge_bps: float,
 ) -> dict | None:
@@ -217,7 +219,7 @@ def _build_candidate(
 
     long_next_ms = int(long_row["next_funding_ms"])
     short_next_ms = int(short_row["next_funding_ms"])
-    hold_minutes = max(long_next_ms, short_next_ms) - int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+    hold_minutes = max(long_next_ms, short_next_ms) - now_ms
     hold_minutes = max(0.0, hold_minutes / 60_000)
 
     funding_skew_min = abs(long_next_ms - short_next_ms) / 60_000
@@ -253,6 +255,7 @@ def _build_candidate(
 
 def build_candidates(
     run_at: str,
+    now_ms: int,
     symbols: list[str],
     binance: dict[str, dict[str, float | int]],
     bybit: dict[str, dict[str, float | int]],
@@ -274,6 +277,7 @@ def build_candidates(
             short_venue="bybit",
             long_row=b,
             short_row=y,
+            now_ms=now_ms,
             size_usd=size_usd,
             min_gross_edge_bps=min_gross_edge_bps,
         )
@@ -287,6 +291,7 @@ def build_candidates(
             short_venue="binance",
             long_row=y,
             short_row=b,
+            now_ms=now_ms,
             size_usd=size_usd,
             min_gross_edge_bps=min_gross_edge_bps,
         )
@@ -296,25 +301,48 @@ def build_candidates(
     return sorted(out, key=lambda row: row["gross_edge_bps"], reverse=True)
 
 
-def parse_args() -> argparse.Namespace:
+def _dumps_rows(rows: list[dict]) -> str:
+    """Serialize a list of flat records as a JSON array with one compact record per line.
+
+    Still plain JSON for every reader, but each record goes through the C encoder
+    (no indent) and git diffs stay one line per row.
+    """
+    if not rows:
+        return "[]"
+    return "[\n" + ",\n".join(json.dumps(row, separators=(",", ":")) for row in rows) + "\n]\n"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build live funding carry candidates (Binance + Bybit perp).")
     p.add_argument("--symbols", nargs="*", default=DEFAULT_SYMBOLS)
     p.add_argument("--size-usd", type=float, default=10_000)
     p.add_argument("--min-gross-edge-bps", type=float, default=0.4)
+    p.add_argument(
+        "--http-cache-ttl-sec",
+        type=float,
+        default=DEFAULT_HTTP_CACHE_TTL_SEC,
+        help="Reuse funding snapshots younger than this (0 disables the cache)",
+    )
     p.add_argument("--funding-out", type=Path, default=DEFAULT_FUNDING_OUT)
     p.add_argument("--candidates-out", type=Path, default=DEFAULT_CANDIDATES_OUT)
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
-def main() -> None:
-    args = parse_args()
-    run_at = datetime.now(tz=timezone.utc).isoformat()
-    now_ms = int(datetime.now(tz=timezone.utc).timestamp() * 1000)
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    # One clock read for the whole run: detected_at and every funding countdown agree.
+    now = datetime.now(tz=timezone.utc)
+    run_at = now.isoformat()
+    now_ms = int(now.timestamp() * 1000)
 
     symbols = sorted(set(args.symbols))
 
-    binance = fetch_binance_funding()
-    bybit = fetch_bybit_funding()
+    # Both venue snapshots are independent network waits; fetch them side by side.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        f_binance = pool.submit(fetch_binance_funding, args.http_cache_ttl_sec)
+        f_bybit = pool.submit(fetch_bybit_funding, args.http_cache_ttl_sec)
+    binance = f_binance.result()
+    bybit = f_bybit.result()
 
     normalized_funding = normalize_funding(
         run_at=run_at,
@@ -326,6 +354,7 @@ def main() -> None:
 
     candidates = build_candidates(
         run_at=run_at,
+        now_ms=now_ms,
         symbols=symbols,
         binance=binance,
         bybit=bybit,
@@ -336,8 +365,18 @@ def main() -> None:
     args.funding_out.parent.mkdir(parents=True, exist_ok=True)
     args.candidates_out.parent.mkdir(parents=True, exist_ok=True)
 
-    args.funding_out.write_text(json.dumps([asdict(row) for row in normalized_funding], indent=2))
-    args.candidates_out.write_text(json.dumps(candidates, indent=2))
+    # Rows hold only flat scalars; read the fields directly rather than paying for
+    # asdict()'s recursive deep copy of each one.
+    funding_fields = attrgetter(*_FUNDING_QUOTE_FIELDS)
+    outputs = [
+        (
+            args.funding_out,
+            _dumps_rows([dict(zip(_FUNDING_QUOTE_FIELDS, funding_fields(row))) for row in normalized_funding]),
+        ),
+        (args.candidates_out, _dumps_rows(candidates)),
+    ]
+    for path, text in outputs:
+        atomic_write_bytes(path, text.encode("utf-8"))
 
     print(f"Funding rows normalized: {len(normalized_funding)}")
     print(f"Candidates built: {len(candidates)}")
@@ -235,7 +235,7 @@ def build_eth_model(size_usd: float, eth_usd: float, dex_tx_legs: int, gas_units
     }
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build network friction model for DEX execution")
     p.add_argument("--size-usd", type=float, default=5000.0)
     p.add_argument("--dex-roundtrip-tx-legs", type=int, default=2)
@@ -243,11 +243,11 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--evm-gas-units-per-leg", type=int, default=180_000)
     p.add_argument("--jupiter-router-fee-bps", type=float, default=4.0)
     p.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     run_at = datetime.now(tz=timezone.utc).isoformat()
 
     prices, price_warnings = _fetch_mid_price_map()
@@ -15,12 +15,12 @@ DEFAULT_DASHBOARD_MD = ROOT / "opportunities" / "dashboard-latest.md"
 DEFAULT_OUT_DIR = ROOT / "site"
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build static dashboard site for GitHub Pages")
     p.add_argument("--shortlist", type=Path, default=DEFAULT_SHORTLIST)
     p.add_argument("--dashboard", type=Path, default=DEFAULT_DASHBOARD_MD)
     p.add_argument("--out-dir", type=Path, default=DEFAULT_OUT_DIR)
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
 def _fmt(v: float, n: int = 2) -> str:
@@ -109,8 +109,8 @@ def build_html(rows: list[dict], generated_at: str) -> str:
 """
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     rows = _read_json(args.shortlist)
     generated_at = datetime.now(tz=timezone.utc).replace(microsecond=0).isoformat()
 
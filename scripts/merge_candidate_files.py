@@ -8,15 +8,15 @@ import json
 from pathlib import Path
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Merge candidate JSON array files.")
     p.add_argument("--inputs", nargs="+", type=Path, required=True, help="Input JSON files (array)")
     p.add_argument("--output", type=Path, required=True, help="Merged output JSON file")
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     merged = []
 
     for path in args.inputs:
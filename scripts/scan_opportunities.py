@@ -905,7 +905,7 @@ def render_markdown(
     return "\n".join(lines) + "\n"
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Score opportunity candidates with risk gates.")
     p.add_argument("--input", type=Path, default=DEFAULT_INPUT_PATH, help="Input opportunity JSON list")
     p.add_argument("--output-json", type=Path, default=DEFAULT_OUTPUT_JSON, help="Output scored JSON")
@@ -951,7 +951,7 @@ def parse_args() -> argparse.Namespace:
         ),
     )
 
-    return p.parse_args()
+    return p.parse_args(argv)
 
 
 def _parse_strategy_overrides(raw_overrides: list[str]) -> dict[str, float]:
@@ -985,8 +985,8 @@ def _parse_strategy_overrides(raw_overrides: list[str]) -> dict[str, float]:
     return parsed
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
     data = json.loads(args.input.read_text())
 
     profile = EXECUTION_PROFILES[args.execution_profile]